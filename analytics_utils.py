@@ -0,0 +1,167 @@
+"""
+Per-upload analytics aggregates
+Computed once per scored chunk at ingestion time and stored as additive
+sums/counts, so any number of uploads can be merged without rescanning customers
+"""
+
+import numpy as np
+import pandas as pd
+
+
+# Probability histogram bins, in percent
+PROBABILITY_BIN_EDGES = list(range(0, 101, 10))
+
+# Tenure bands in months: (label, upper bound inclusive)
+TENURE_BANDS = [('0-12', 12), ('13-24', 24), ('25-48', 48), ('49+', np.inf)]
+
+# Dimensions reported as churn rate breakdowns
+GROUP_DIMENSIONS = {
+    'by_contract': 'Contract',
+    'by_tenure_band': 'TenureBand',
+    'by_internet_service': 'InternetService',
+    'by_payment_method': 'PaymentMethod',
+}
+
+RISK_LEVELS = ['High', 'Medium', 'Low']
+
+
+def empty_aggregates():
+    """Aggregates of an empty upload; the identity for merge_aggregates"""
+    return {
+        'total': 0,
+        'churn_count': 0,
+        'probability_sum': 0.0,
+        'probability_histogram': {
+            'edges': PROBABILITY_BIN_EDGES,
+            'counts': [0] * (len(PROBABILITY_BIN_EDGES) - 1)
+        },
+        **{key: {} for key in GROUP_DIMENSIONS},
+        'by_risk_level': {}
+    }
+
+
+def compute_aggregates(scored):
+    """
+    Aggregate one scored chunk with one vectorized groupby per dimension
+
+    Args:
+        scored (DataFrame): Validated customer frame plus 'probability' (percent),
+            'will_churn' (0/1) and 'risk_level' columns
+
+    Returns:
+        dict: Additive aggregates (see empty_aggregates for the layout)
+    """
+    aggregates = empty_aggregates()
+    if scored.empty:
+        return aggregates
+
+    probability = scored['probability'].to_numpy(dtype=float)
+    counts, _ = np.histogram(probability, bins=PROBABILITY_BIN_EDGES)
+
+    aggregates['total'] = int(len(scored))
+    aggregates['churn_count'] = int(scored['will_churn'].sum())
+    aggregates['probability_sum'] = float(probability.sum())
+    aggregates['probability_histogram']['counts'] = counts.tolist()
+
+    frame = scored.assign(
+        TenureBand=pd.cut(
+            scored['tenure'],
+            bins=[-np.inf] + [upper for _, upper in TENURE_BANDS],
+            labels=[label for label, _ in TENURE_BANDS]
+        )
+    )
+
+    for key, column in GROUP_DIMENSIONS.items():
+        grouped = frame.groupby(column, observed=True).agg(
+            count=('will_churn', 'size'),
+            churn_count=('will_churn', 'sum'),
+            probability_sum=('probability', 'sum')
+        )
+        aggregates[key] = {
+            str(value): {
+                'count': int(row['count']),
+                'churn_count': int(row['churn_count']),
+                'probability_sum': float(row['probability_sum'])
+            }
+            for value, row in grouped.iterrows()
+        }
+
+    grouped = frame.groupby('risk_level', observed=True).agg(
+        count=('risk_level', 'size'),
+        monthly_charges_sum=('MonthlyCharges', 'sum'),
+        total_charges_sum=('TotalCharges', 'sum')
+    )
+    aggregates['by_risk_level'] = {
+        str(level): {
+            'count': int(row['count']),
+            'monthly_charges_sum': float(row['monthly_charges_sum']),
+            'total_charges_sum': float(row['total_charges_sum'])
+        }
+        for level, row in grouped.iterrows()
+    }
+
+    return aggregates
+
+
+def _merge_groups(target, source):
+    for value, stats in source.items():
+        merged = target.setdefault(value, {name: 0 for name in stats})
+        for name, amount in stats.items():
+            merged[name] = merged.get(name, 0) + amount
+
+
+def merge_aggregates(aggregates_list):
+    """Sum any number of aggregates (chunks of one upload, or several uploads)"""
+    merged = empty_aggregates()
+    for aggregates in aggregates_list:
+        merged['total'] += aggregates['total']
+        merged['churn_count'] += aggregates['churn_count']
+        merged['probability_sum'] += aggregates['probability_sum']
+        merged['probability_histogram']['counts'] = [
+            a + b for a, b in zip(merged['probability_histogram']['counts'],
+                                  aggregates['probability_histogram']['counts'])
+        ]
+        for key in list(GROUP_DIMENSIONS) + ['by_risk_level']:
+            _merge_groups(merged[key], aggregates.get(key, {}))
+    return merged
+
+
+def summarize_aggregates(aggregates):
+    """
+    Turn additive aggregates into the rates and averages shown on the analytics page
+
+    Returns:
+        dict: Totals, probability histogram, churn rate per group, average charges per risk level
+    """
+    def rate(part, whole):
+        return round(part / whole * 100, 1) if whole else 0
+
+    summary = {
+        'total_customers': aggregates['total'],
+        'predicted_churn': aggregates['churn_count'],
+        'churn_rate': rate(aggregates['churn_count'], aggregates['total']),
+        'avg_probability': round(aggregates['probability_sum'] / aggregates['total'], 1) if aggregates['total'] else 0,
+        'probability_histogram': aggregates['probability_histogram']
+    }
+
+    for key in GROUP_DIMENSIONS:
+        summary[key] = {
+            value: {
+                'count': stats['count'],
+                'churn_rate': rate(stats['churn_count'], stats['count']),
+                'avg_probability': round(stats['probability_sum'] / stats['count'], 1) if stats['count'] else 0
+            }
+            for value, stats in aggregates[key].items()
+        }
+
+    summary['by_risk_level'] = {}
+    for level in RISK_LEVELS:
+        stats = aggregates['by_risk_level'].get(level, {'count': 0, 'monthly_charges_sum': 0, 'total_charges_sum': 0})
+        count = stats['count']
+        summary['by_risk_level'][level] = {
+            'count': count,
+            'avg_monthly_charges': round(stats['monthly_charges_sum'] / count, 2) if count else 0,
+            'avg_total_charges': round(stats['total_charges_sum'] / count, 2) if count else 0
+        }
+
+    return summary
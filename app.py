@@ -5,27 +5,77 @@ Guaranteed database saving with comprehensive error handling
 
 from flask import Flask, render_template, request, jsonify, Response
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
-import pandas as pd
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, inspect, text, tuple_
+import base64
+import json
 import uuid
 import os
+import shutil
+import threading
+import time
 import traceback
 
+import numpy as np
+import pandas as pd
+
+from data_utils import (
+    iter_customer_chunks, validate_customer_frame, ValidationReport,
+    DEFAULT_CHUNK_SIZE, VALIDATION_POLICIES
+)
+from analytics_utils import compute_aggregates, merge_aggregates, summarize_aggregates
+from drift_utils import (
+    build_reference, compute_drift_stats, drift_report, empty_drift_stats, is_compatible, merge_drift_stats,
+    update_drift_stats
+)
+from http_utils import init_http, to_columnar
+from archive_utils import DEFAULT_ARCHIVE_DIR, write_archive
+from model_registry import ModelRegistry, RuleBasedModel
+
 app = Flask(__name__)
 
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///churn_predictions.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['SECRET_KEY'] = 'churn-prediction-secret-key-2026'
+app.config['BATCH_CHUNK_SIZE'] = int(os.environ.get('BATCH_CHUNK_SIZE', DEFAULT_CHUNK_SIZE))
+app.config['VALIDATION_POLICY'] = os.environ.get('VALIDATION_POLICY', 'default')
+app.config['MODEL_POLL_INTERVAL'] = int(os.environ.get('MODEL_POLL_INTERVAL', 30))
+app.config['DRIFT_REFERENCE_PATH'] = os.environ.get('DRIFT_REFERENCE_PATH', 'customer_data.csv')
+# Uploads older than RETENTION_DAYS are archived out of the live DB (0 disables);
+# the compaction job runs every COMPACTION_INTERVAL seconds (0 disables the thread)
+app.config['RETENTION_DAYS'] = int(os.environ.get('RETENTION_DAYS', 90))
+app.config['ARCHIVE_DIR'] = os.environ.get('ARCHIVE_DIR', DEFAULT_ARCHIVE_DIR)
+app.config['COMPACTION_INTERVAL'] = int(os.environ.get('COMPACTION_INTERVAL', 3600))
+app.config['COMPACTION_BATCH'] = int(os.environ.get('COMPACTION_BATCH', 50))
 
 db = SQLAlchemy(app)
+init_http(app)
 
 try:
     from model_utils import ChurnPredictor
-    predictor = ChurnPredictor()
+    rules_model = RuleBasedModel(ChurnPredictor())
     print("✅ ChurnPredictor loaded successfully")
 except Exception as e:
     print(f"⚠️ Warning: Could not load ChurnPredictor: {e}")
-    predictor = None
+    rules_model = None
+
+# Trained ensemble versions from models/registry, hot-swapped when LATEST changes;
+# the rule-based predictor serves until a version is available
+registry = ModelRegistry(fallback=rules_model)
+try:
+    registry.reload_latest()
+except Exception as e:
+    print(f"⚠️ Warning: Could not load latest model version: {e}")
+registry.start_watcher(app.config['MODEL_POLL_INTERVAL'])
+print(f"✅ Active model version: {getattr(registry.current, 'version', None)}")
+
+# Training distribution that uploads are compared against for drift
+try:
+    drift_reference = build_reference(app.config['DRIFT_REFERENCE_PATH'])
+    print(f"✅ Drift reference loaded: {drift_reference['stats']['total']} customers")
+except Exception as e:
+    print(f"⚠️ Warning: Could not build drift reference: {e}")
+    drift_reference = None
 
 
 # ===========================
@@ -42,6 +92,14 @@ class Upload(db.Model):
     medium_risk_count = db.Column(db.Integer, default=0)
     low_risk_count = db.Column(db.Integer, default=0)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    # Set once the upload's customers and predictions are moved to an archive file
+    archived_at = db.Column(db.DateTime)
+    archive_path = db.Column(db.String(255))
+
+    # Keyset pagination on (created_at, id)
+    __table_args__ = (
+        db.Index('ix_upload_created_at_id', 'created_at', 'id'),
+    )
 
     def to_dict(self):
         return {
@@ -52,14 +110,16 @@ class Upload(db.Model):
             'high_risk_count': self.high_risk_count,
             'medium_risk_count': self.medium_risk_count,
             'low_risk_count': self.low_risk_count,
-            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+            'archived': self.archived_at is not None,
+            'archived_at': self.archived_at.strftime('%Y-%m-%d %H:%M:%S') if self.archived_at else None
         }
 
 
 class Customer(db.Model):
     _tablename_ = 'customers'
     id = db.Column(db.Integer, primary_key=True)
-    upload_id = db.Column(db.String(50), nullable=False)
+    upload_id = db.Column(db.String(50), nullable=False, index=True)
     gender = db.Column(db.String(10))
     senior_citizen = db.Column(db.Integer)
     partner = db.Column(db.String(10))
@@ -92,12 +152,18 @@ class Customer(db.Model):
 class Prediction(db.Model):
     _tablename_ = 'predictions'
     id = db.Column(db.Integer, primary_key=True)
-    customer_id = db.Column(db.Integer, nullable=False)
+    customer_id = db.Column(db.Integer, nullable=False, index=True)
     will_churn = db.Column(db.Integer)
-    churn_probability = db.Column(db.Float)
+    churn_probability = db.Column(db.Float, index=True)
     risk_level = db.Column(db.String(20))
+    model_version = db.Column(db.String(50))
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Top-N by probability within one risk level is an index range scan
+    __table_args__ = (
+        db.Index('ix_prediction_risk_level_probability', 'risk_level', 'churn_probability'),
+    )
+
     def to_dict(self):
         return {
             'id': self.id,
@@ -105,14 +171,82 @@ class Prediction(db.Model):
             'will_churn': self.will_churn,
             'churn_probability': self.churn_probability,
             'risk_level': self.risk_level,
+            'model_version': self.model_version,
+            'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        }
+
+
+class UploadAnalytics(db.Model):
+    _tablename_ = 'upload_analytics'
+    id = db.Column(db.Integer, primary_key=True)
+    upload_id = db.Column(db.String(50), unique=True, nullable=False)
+    aggregates = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            'upload_id': self.upload_id,
+            'aggregates': json.loads(self.aggregates),
             'created_at': self.created_at.strftime('%Y-%m-%d %H:%M:%S')
         }
 
 
+class UploadDrift(db.Model):
+    _tablename_ = 'upload_drift'
+    id = db.Column(db.Integer, primary_key=True)
+    upload_id = db.Column(db.String(50), unique=True, nullable=False)
+    stats = db.Column(db.Text, nullable=False)
+    max_psi = db.Column(db.Float)
+    status = db.Column(db.String(20))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
+class WriteVersion(db.Model):
+    """Counter bumped in the same transaction as every insert/delete of a resource"""
+    _tablename_ = 'write_versions'
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+def bump_write_version(name):
+    """Atomically increment a write version; commit happens with the caller's transaction"""
+    now = datetime.utcnow().replace(microsecond=0)
+    updated = WriteVersion.query.filter_by(name=name).update(
+        {'version': WriteVersion.version + 1, 'updated_at': now}
+    )
+    if not updated:
+        db.session.add(WriteVersion(name=name, version=1, updated_at=now))
+
+
+def is_enabled(value):
+    """Truthy query/form flag: 1, true, yes or on"""
+    return str(value).strip().lower() in ('1', 'true', 'yes', 'on')
+
+
 def init_db():
     try:
         with app.app_context():
+            # auto_vacuum can only be set for free before the first table exists;
+            # existing databases are converted by the compaction job instead
+            if db.engine.dialect.name == 'sqlite':
+                with db.engine.begin() as conn:
+                    if conn.execute(text('PRAGMA page_count')).scalar() == 0:
+                        conn.execute(text('PRAGMA auto_vacuum = INCREMENTAL'))
+                        db.metadata.create_all(conn)
             db.create_all()
+            # create_all skips existing tables, so add columns and indexes introduced later
+            inspector = inspect(db.engine)
+            for table in db.metadata.sorted_tables:
+                existing = {column['name'] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name not in existing:
+                        column_type = column.type.compile(dialect=db.engine.dialect)
+                        with db.engine.begin() as conn:
+                            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                        print(f"✅ Added column {table.name}.{column.name}")
+                for index in table.indexes:
+                    index.create(db.engine, checkfirst=True)
             print("✅ Database initialized successfully")
     except Exception as e:
         print(f"⚠️ Database init warning: {e}")
@@ -120,6 +254,151 @@ def init_db():
 init_db()
 
 
+# ===========================
+# RETENTION & COMPACTION
+# ===========================
+
+# Customer + prediction columns written to an upload's archive file
+ARCHIVE_COLUMNS = [
+    Customer.id.label('customer_id'),
+    Customer.gender, Customer.senior_citizen, Customer.partner, Customer.dependents,
+    Customer.tenure, Customer.contract, Customer.payment_method,
+    Customer.monthly_charges, Customer.total_charges, Customer.internet_service,
+    Prediction.will_churn, Prediction.churn_probability, Prediction.risk_level,
+    Prediction.model_version, Prediction.created_at.label('predicted_at'),
+]
+
+compaction_lock = threading.Lock()
+
+
+def delete_upload_rows(upload_id):
+    """Bulk-delete an upload's predictions and customers; commit happens with the caller's transaction"""
+    customer_ids = db.select(Customer.id).where(Customer.upload_id == upload_id)
+    Prediction.query.filter(Prediction.customer_id.in_(customer_ids)).delete(synchronize_session=False)
+    Customer.query.filter_by(upload_id=upload_id).delete(synchronize_session=False)
+
+
+def vacuum_database():
+    """
+    Return free SQLite pages to the OS; returns the number of pages released
+
+    A database created before incremental auto-vacuum was enabled is converted
+    once with a full VACUUM here (off the request path), provided there is about
+    twice its size in free disk. After that, PRAGMA incremental_vacuum with no
+    page count releases the whole freelist in one pass.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return 0
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        page_size = conn.execute(text('PRAGMA page_size')).scalar()
+        before = conn.execute(text('PRAGMA page_count')).scalar()
+
+        if conn.execute(text('PRAGMA auto_vacuum')).scalar() != 2:
+            path = conn.execute(text('PRAGMA database_list')).fetchone()[2]
+            free = shutil.disk_usage(os.path.dirname(os.path.abspath(path))).free
+            if free < 2 * before * page_size:
+                print(f"⚠️ Not enough free disk to enable incremental auto-vacuum "
+                      f"({free // 2**20} MB free, DB is {before * page_size // 2**20} MB)")
+                return 0
+            print("🧹 Converting database to incremental auto-vacuum (one-time full VACUUM)...")
+            conn.execute(text('PRAGMA auto_vacuum = INCREMENTAL'))
+            conn.execute(text('VACUUM'))
+        else:
+            # sqlite3's execute() steps this pragma once (one page); executescript runs it to completion
+            conn.connection.dbapi_connection.executescript('PRAGMA incremental_vacuum;')
+
+        after = conn.execute(text('PRAGMA page_count')).scalar()
+    return max(before - after, 0)
+
+
+def compact_old_uploads(retention_days=None, max_uploads=None):
+    """
+    Archive uploads older than the retention window and shrink the database
+
+    Each upload's customers and predictions are written to a compressed
+    columnar file, then deleted from SQLite in the same transaction that marks
+    the Upload row archived; the Upload summary, analytics and drift rows stay.
+    A crash between the file write and the commit leaves the rows live and the
+    upload is simply archived again on the next run.
+
+    Returns:
+        dict: Archived uploads, rows moved and SQLite pages released
+    """
+    retention_days = app.config['RETENTION_DAYS'] if retention_days is None else retention_days
+    if retention_days <= 0:
+        raise ValueError('Retention is disabled (RETENTION_DAYS=0)')
+    max_uploads = app.config['COMPACTION_BATCH'] if max_uploads is None else max_uploads
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+
+    uploads = (Upload.query
+               .filter(Upload.archived_at.is_(None), Upload.created_at < cutoff)
+               .order_by(Upload.created_at, Upload.id)
+               .limit(max_uploads)
+               .all())
+
+    archived = []
+    for upload in uploads:
+        rows = (db.session.query(*ARCHIVE_COLUMNS)
+                .outerjoin(Prediction, Prediction.customer_id == Customer.id)
+                .filter(Customer.upload_id == upload.upload_id)
+                .order_by(Customer.id)
+                .all())
+        frame = pd.DataFrame(rows, columns=[column.key for column in ARCHIVE_COLUMNS])
+        path = write_archive(frame, app.config['ARCHIVE_DIR'], upload.upload_id)
+
+        delete_upload_rows(upload.upload_id)
+        upload.archived_at = datetime.utcnow()
+        upload.archive_path = path
+        bump_write_version('uploads')
+        db.session.commit()
+
+        archived.append({'upload_id': upload.upload_id, 'rows': len(frame), 'archive_path': path})
+        print(f"📦 Archived upload {upload.upload_id}: {len(frame)} rows -> {path}")
+
+    pages_released = vacuum_database()
+
+    return {
+        'retention_days': retention_days,
+        'cutoff': cutoff.strftime('%Y-%m-%d %H:%M:%S'),
+        'archived_uploads': archived,
+        'archived_rows': sum(item['rows'] for item in archived),
+        'pages_released': pages_released
+    }
+
+
+def run_compaction(retention_days=None):
+    """compact_old_uploads under the compaction lock; returns None if a run is already in progress"""
+    if not compaction_lock.acquire(blocking=False):
+        return None
+    try:
+        return compact_old_uploads(retention_days)
+    except Exception:
+        db.session.rollback()
+        raise
+    finally:
+        compaction_lock.release()
+
+
+def start_compaction_worker(interval):
+    """Run compaction periodically in a daemon thread"""
+    if interval <= 0 or app.config['RETENTION_DAYS'] <= 0:
+        return
+
+    def work():
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    run_compaction()
+                except Exception as e:
+                    print(f"⚠️ Compaction failed: {e}")
+
+    threading.Thread(target=work, name='compaction-worker', daemon=True).start()
+
+
+start_compaction_worker(app.config['COMPACTION_INTERVAL'])
+
+
 # ===========================
 # PAGE ROUTES
 # ===========================
@@ -157,14 +436,29 @@ def health():
 def predict():
     try:
         data = request.get_json()
-        if predictor:
-            prediction, probability = predictor.predict(data)
+        model = registry.current
+        if model:
+            # Interactive path uses the distilled tier; batches use the full ensemble
+            explanation = None
+            if is_enabled(request.args.get('explain')):
+                prediction, probability, base, factors = model.explain_interactive(data)
+                explanation = {
+                    'base_probability': round(base, 4),
+                    'factors': {name: round(value, 4) for name, value in factors.items()}
+                }
+            else:
+                prediction, probability = model.predict_interactive(data)
             risk_level = 'High' if probability > 0.7 else ('Medium' if probability > 0.3 else 'Low')
-            return jsonify({
+            result = {
                 'prediction': int(prediction),
                 'probability': float(probability),
-                'risk_level': risk_level
-            })
+                'risk_level': risk_level,
+                'model_version': model.version,
+                'model_tier': model.interactive_tier
+            }
+            if explanation:
+                result['explanation'] = explanation
+            return jsonify(result)
         else:
             return jsonify({'error': 'Predictor not available'}), 500
     except Exception as e:
@@ -173,6 +467,42 @@ def predict():
         return jsonify({'error': str(e)}), 500
 
 
+def save_scored_chunk(upload_id, chunk, preds, probs_pct, risks, model_version):
+    """
+    Bulk-insert one scored chunk's customers and predictions
+
+    Runs inside the upload's transaction, so a rejected or failed upload rolls
+    back every chunk, while Python-side row objects never outlive the chunk.
+    """
+    columns = {
+        'gender': chunk['Gender'].astype(str).tolist(),
+        'senior_citizen': chunk['SeniorCitizen'].astype(int).tolist(),
+        'partner': chunk['Partner'].astype(str).tolist(),
+        'dependents': chunk['Dependents'].astype(str).tolist(),
+        'tenure': chunk['tenure'].astype(int).tolist(),
+        'contract': chunk['Contract'].astype(str).tolist(),
+        'payment_method': chunk['PaymentMethod'].astype(str).tolist(),
+        'monthly_charges': chunk['MonthlyCharges'].astype(float).round(2).tolist(),
+        'total_charges': chunk['TotalCharges'].astype(float).round(2).tolist(),
+        'internet_service': chunk['InternetService'].astype(str).tolist(),
+    }
+    customers = [dict(zip(columns, values), upload_id=upload_id) for values in zip(*columns.values())]
+    customer_ids = db.session.scalars(
+        insert(Customer).returning(Customer.id, sort_by_parameter_order=True), customers
+    ).all()
+
+    db.session.execute(insert(Prediction), [
+        {
+            'customer_id': customer_id,
+            'will_churn': pred,
+            'churn_probability': prob,
+            'risk_level': risk,
+            'model_version': model_version
+        }
+        for customer_id, pred, prob, risk in zip(customer_ids, preds.tolist(), probs_pct.tolist(), risks.tolist())
+    ])
+
+
 @app.route('/batch-predict', methods=['POST'])
 def batch_predict():
     print("\n" + "="*50)
@@ -194,43 +524,83 @@ def batch_predict():
         print(f"📝 Upload ID: {upload_id}")
         print(f"📄 Filename: {file.filename}")
 
-        # Read CSV
-        df = pd.read_csv(file)
-        print(f"📊 CSV loaded: {len(df)} rows")
-        print(f"📊 Columns: {list(df.columns)}")
+        # Validation policy for bad cells: default / skip / reject
+        policy = request.form.get('policy', app.config['VALIDATION_POLICY'])
+        if policy not in VALIDATION_POLICIES:
+            return jsonify({'error': f'Unknown validation policy: {policy}'}), 400
+        report = ValidationReport(policy)
+
+        # Response layout: 'rows' (list of objects) or 'columnar' (arrays per field)
+        layout = request.form.get('layout', 'rows')
+        if layout not in ('rows', 'columnar'):
+            return jsonify({'error': f'Unknown layout: {layout}'}), 400
+
+        # Per-customer factor contributions, computed in the same pass as scoring
+        explain = is_enabled(request.form.get('explain'))
+
+        # Pin one model version for the whole upload, even if a reload lands mid-request
+        model = registry.current
+        model_version = model.version if model else None
+
+        # Stream the upload in chunks with the declared customer schema, plus the
+        # service columns the pinned model was trained on
+        chunks = iter_customer_chunks(
+            file, file.filename, app.config['BATCH_CHUNK_SIZE'],
+            optional_columns=model.optional_columns if model else ()
+        )
 
         # Process predictions
         results = []
         high_risk = 0
         medium_risk = 0
         low_risk = 0
-        customers_data = []
+        chunk_aggregates = []
+        # Rows are written chunk by chunk in one transaction, committed after the last chunk
+        persist = True
+        saved_customers = 0
+        explanation = None
+        # Drift stats are folded in per chunk, so memory stays O(bins) for any upload size
+        drift_stats = empty_drift_stats(drift_reference) if drift_reference else None
 
-        for idx, row in df.iterrows():
-            try:
+        for chunk in chunks:
+            chunk, imputed = validate_customer_frame(chunk, report, return_imputed=True)
+            print(f"📊 Chunk validated: {len(chunk)} rows, {chunk.memory_usage(deep=True).sum() / 1024:.1f} KB")
+
+            # Keep validating the rest of the file so the report is complete
+            if report.rejected:
+                continue
+
+            # Score the whole chunk at once
+            chunk_factors = None
+            if model and explain:
+                chunk_preds, probs, base, factor_names, contributions = model.explain_frame(chunk)
+                explanation = {'base_probability': round(base * 100, 1), 'factors': list(factor_names)}
+                chunk_factors = np.round(contributions * 100, 2).tolist()
+            elif model:
+                chunk_preds, probs = model.predict_frame(chunk)
+            else:
+                chunk_preds, probs = np.zeros(len(chunk), dtype=np.int8), np.full(len(chunk), 0.5)
+
+            chunk_probs = np.round(probs * 100, 1)
+            chunk_risks = np.where(chunk_probs > 70, 'High', np.where(chunk_probs > 30, 'Medium', 'Low'))
+
+            for i, (idx, row, pred, prob_pct, risk) in enumerate(zip(
+                    chunk.index, chunk.itertuples(index=False), chunk_preds.tolist(),
+                    chunk_probs.tolist(), chunk_risks.tolist())):
                 # Extract customer data
                 customer_data = {
-                    'Gender': str(row.get('Gender', row.get('gender', 'Male'))),
-                    'SeniorCitizen': int(row.get('SeniorCitizen', row.get('senior_citizen', row.get('Senior Citizen', 0)))),
-                    'Partner': str(row.get('Partner', row.get('partner', 'No'))),
-                    'Dependents': str(row.get('Dependents', row.get('dependents', 'No'))),
-                    'tenure': int(row.get('tenure', row.get('Tenure', 12))),
-                    'Contract': str(row.get('Contract', row.get('contract', 'Month-to-month'))),
-                    'PaymentMethod': str(row.get('PaymentMethod', row.get('payment_method', row.get('Payment Method', 'Electronic check')))),
-                    'MonthlyCharges': float(row.get('MonthlyCharges', row.get('monthly_charges', row.get('Monthly Charges', 50)))),
-                    'TotalCharges': float(row.get('TotalCharges', row.get('total_charges', row.get('Total Charges', 500)))),
-                    'InternetService': str(row.get('InternetService', row.get('internet_service', row.get('Internet Service', 'No'))))
+                    'Gender': str(row.Gender),
+                    'SeniorCitizen': int(row.SeniorCitizen),
+                    'Partner': str(row.Partner),
+                    'Dependents': str(row.Dependents),
+                    'tenure': int(row.tenure),
+                    'Contract': str(row.Contract),
+                    'PaymentMethod': str(row.PaymentMethod),
+                    'MonthlyCharges': round(float(row.MonthlyCharges), 2),
+                    'TotalCharges': round(float(row.TotalCharges), 2),
+                    'InternetService': str(row.InternetService)
                 }
 
-                # Make prediction
-                if predictor:
-                    pred, prob = predictor.predict(customer_data)
-                else:
-                    pred, prob = 0, 0.5
-
-                prob_pct = round(float(prob) * 100, 1)
-                risk = 'High' if prob_pct > 70 else ('Medium' if prob_pct > 30 else 'Low')
-
                 # Count risks
                 if risk == 'High': 
                     high_risk += 1
@@ -240,28 +610,50 @@ def batch_predict():
                     low_risk += 1
 
                 # Store result
-                results.append({
+                result = {
                     'customer': f'Customer {idx + 1}',
                     'prediction': 'Will Churn' if pred == 1 else 'Will Stay',
                     'probability': prob_pct,
                     'risk_level': risk,
                     **customer_data
-                })
-
-                # Store for database
-                customers_data.append({
-                    'data': customer_data,
-                    'pred': pred,
-                    'prob': prob_pct,
-                    'risk': risk
-                })
+                }
+                if chunk_factors is not None:
+                    # Percentage points, in the order of explanation['factors']
+                    result['factors'] = chunk_factors[i]
+                results.append(result)
 
                 if (idx + 1) % 100 == 0:
                     print(f"✅ Processed {idx + 1} customers...")
 
-            except Exception as e:
-                print(f"⚠️ Error processing row {idx}: {e}")
-                continue
+            if persist:
+                try:
+                    save_scored_chunk(upload_id, chunk, chunk_preds, chunk_probs, chunk_risks, model_version)
+                    saved_customers += len(chunk)
+                    print(f"✅ Saved {saved_customers} customers...")
+                except Exception as db_error:
+                    db.session.rollback()
+                    persist = False
+                    print(f"\n❌ DATABASE SAVE FAILED!")
+                    print(f"Error: {db_error}")
+                    traceback.print_exc()
+                    print("⚠️ Continuing without database save...")
+
+            # Analytics aggregates: one vectorized groupby per dimension per chunk
+            chunk_aggregates.append(compute_aggregates(
+                chunk.assign(probability=chunk_probs, will_churn=chunk_preds, risk_level=chunk_risks)
+            ))
+
+            if drift_stats is not None:
+                update_drift_stats(drift_stats, compute_drift_stats(chunk, drift_reference, imputed))
+
+        validation = report.to_dict()
+        print(f"🔎 Validation: {validation['total_errors']} errors, "
+              f"{validation['rows_skipped']} rows skipped, {validation['cells_defaulted']} cells defaulted")
+
+        if report.rejected:
+            print("❌ Upload rejected by validation")
+            db.session.rollback()
+            return jsonify({'error': 'Upload failed validation', 'validation': validation}), 400
 
         total = len(results)
         print(f"\n✅ PREDICTION COMPLETE")
@@ -275,84 +667,61 @@ def batch_predict():
         print("💾 STARTING DATABASE SAVE")
         print("="*50)
 
-        try:
-            # Create upload record
-            print(f"📝 Creating Upload record...")
-            upload = Upload(
-                upload_id=upload_id,
-                filename=file.filename,
-                total_customers=total,
-                high_risk_count=high_risk,
-                medium_risk_count=medium_risk,
-                low_risk_count=low_risk
-            )
-            db.session.add(upload)
-            db.session.flush()
-            print(f"✅ Upload record created: ID={upload.id}")
-
-            # Save customers and predictions
-            print(f"📝 Saving {len(customers_data)} customers...")
-            
-            for idx, item in enumerate(customers_data):
-                try:
-                    cd = item['data']
-                    
-                    # Create customer
-                    customer = Customer(
+        drift = None
+        if persist:
+            try:
+                # Create upload record
+                print(f"📝 Creating Upload record...")
+                upload = Upload(
+                    upload_id=upload_id,
+                    filename=file.filename,
+                    total_customers=total,
+                    high_risk_count=high_risk,
+                    medium_risk_count=medium_risk,
+                    low_risk_count=low_risk
+                )
+                db.session.add(upload)
+                db.session.flush()
+                print(f"✅ Upload record created: ID={upload.id}")
+
+                bump_write_version('uploads')
+
+                db.session.add(UploadAnalytics(
+                    upload_id=upload_id,
+                    aggregates=json.dumps(merge_aggregates(chunk_aggregates))
+                ))
+
+                if drift_stats is not None:
+                    drift = drift_report(drift_stats, drift_reference)
+                    db.session.add(UploadDrift(
                         upload_id=upload_id,
-                        gender=cd['Gender'],
-                        senior_citizen=cd['SeniorCitizen'],
-                        partner=cd['Partner'],
-                        dependents=cd['Dependents'],
-                        tenure=cd['tenure'],
-                        contract=cd['Contract'],
-                        payment_method=cd['PaymentMethod'],
-                        monthly_charges=cd['MonthlyCharges'],
-                        total_charges=cd['TotalCharges'],
-                        internet_service=cd['InternetService']
-                    )
-                    db.session.add(customer)
-                    db.session.flush()
-                    
-                    # Create prediction
-                    prediction_obj = Prediction(
-                        customer_id=customer.id,
-                        will_churn=int(item['pred']),
-                        churn_probability=float(item['prob']),
-                        risk_level=item['risk']
-                    )
-                    db.session.add(prediction_obj)
-                    
-                    if (idx + 1) % 100 == 0:
-                        db.session.flush()
-                        print(f"✅ Saved {idx + 1} customers...")
-                
-                except Exception as e:
-                    print(f"❌ Error saving customer {idx}: {e}")
-                    traceback.print_exc()
-                    continue
-
-            # Commit all changes
-            print("💾 Committing to database...")
-            db.session.commit()
-            print("✅ DATABASE SAVE SUCCESSFUL!")
-            
-            # Verify save
-            saved_upload = Upload.query.filter_by(upload_id=upload_id).first()
-            saved_customers = Customer.query.filter_by(upload_id=upload_id).count()
-            saved_predictions = Prediction.query.count()
-            
-            print(f"\n✅ VERIFICATION:")
-            print(f"   Upload saved: {saved_upload is not None}")
-            print(f"   Customers saved: {saved_customers}")
-            print(f"   Total predictions: {saved_predictions}")
-
-        except Exception as db_error:
-            db.session.rollback()
-            print(f"\n❌ DATABASE SAVE FAILED!")
-            print(f"Error: {db_error}")
-            traceback.print_exc()
-            print("⚠️ Continuing without database save...")
+                        stats=json.dumps(drift_stats),
+                        max_psi=drift['max_psi'],
+                        status=drift['status']
+                    ))
+                    print(f"📈 Drift: max PSI {drift['max_psi']} ({drift['max_psi_feature']}), {drift['status']}")
+
+                # Commit all changes
+                print("💾 Committing to database...")
+                db.session.commit()
+                print("✅ DATABASE SAVE SUCCESSFUL!")
+
+                # Verify save
+                saved_upload = Upload.query.filter_by(upload_id=upload_id).first()
+                saved_customers = Customer.query.filter_by(upload_id=upload_id).count()
+                saved_predictions = Prediction.query.count()
+
+                print(f"\n✅ VERIFICATION:")
+                print(f"   Upload saved: {saved_upload is not None}")
+                print(f"   Customers saved: {saved_customers}")
+                print(f"   Total predictions: {saved_predictions}")
+
+            except Exception as db_error:
+                db.session.rollback()
+                print(f"\n❌ DATABASE SAVE FAILED!")
+                print(f"Error: {db_error}")
+                traceback.print_exc()
+                print("⚠️ Continuing without database save...")
 
         # Return response
         print("\n" + "="*50)
@@ -370,7 +739,12 @@ def batch_predict():
                 'low_risk': low_risk,
                 'low_risk_pct': round(low_risk / total * 100, 1) if total > 0 else 0,
             },
-            'results': results
+            'model_version': model_version,
+            'validation': validation,
+            'layout': layout,
+            'explanation': explanation,
+            'drift': {key: drift[key] for key in ('max_psi', 'max_psi_feature', 'status')} if drift else None,
+            'results': to_columnar(results) if layout == 'columnar' else results
         })
 
     except Exception as e:
@@ -394,12 +768,64 @@ Male,1,Yes,No,3,Month-to-month,Electronic check,89.0,267.0,Fiber optic"""
     )
 
 
+def encode_cursor(upload):
+    raw = f"{upload.created_at.isoformat()}|{upload.id}"
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+    created_at, upload_pk = raw.rsplit('|', 1)
+    return datetime.fromisoformat(created_at), int(upload_pk)
+
+
 @app.route('/api/uploads')
 def get_uploads():
+    """
+    Uploads newest first, keyset-paginated on (created_at, id)
+
+    Query params: limit (default 50, max 200), cursor (next_cursor of the previous page).
+    Responses carry an ETag / Last-Modified derived from the uploads write version,
+    so revalidating an unchanged page returns 304 without reading the uploads table.
+    """
     try:
-        uploads = Upload.query.order_by(Upload.created_at.desc()).all()
-        print(f"📊 API /uploads: Found {len(uploads)} uploads")
-        return jsonify({'uploads': [u.to_dict() for u in uploads]})
+        limit = min(max(request.args.get('limit', 50, type=int), 1), 200)
+        cursor = request.args.get('cursor')
+
+        state = db.session.get(WriteVersion, 'uploads')
+        version = state.version if state else 0
+        last_modified = (state.updated_at if state else datetime(1970, 1, 1)).replace(tzinfo=timezone.utc)
+        etag = f"uploads-{version}-{limit}-{cursor or 'first'}"
+
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains_weak(etag)
+        else:
+            not_modified = request.if_modified_since is not None and last_modified <= request.if_modified_since
+        if not_modified:
+            response = Response(status=304)
+        else:
+            query = Upload.query
+            if cursor:
+                try:
+                    created_at, upload_pk = decode_cursor(cursor)
+                except ValueError:
+                    return jsonify({'error': 'Invalid cursor'}), 400
+                query = query.filter(tuple_(Upload.created_at, Upload.id) < tuple_(created_at, upload_pk))
+
+            uploads = query.order_by(Upload.created_at.desc(), Upload.id.desc()).limit(limit + 1).all()
+            has_more = len(uploads) > limit
+            uploads = uploads[:limit]
+            print(f"📊 API /uploads: Returned {len(uploads)} uploads")
+
+            response = jsonify({
+                'uploads': [u.to_dict() for u in uploads],
+                'next_cursor': encode_cursor(uploads[-1]) if has_more else None
+            })
+
+        response.set_etag(etag)
+        response.last_modified = last_modified
+        response.cache_control.no_cache = True
+        return response
     except Exception as e:
         print(f"❌ Error in /api/uploads: {e}")
         traceback.print_exc()
@@ -409,18 +835,22 @@ def get_uploads():
 @app.route('/api/stats')
 def get_stats():
     try:
-        total_customers = Customer.query.count()
-        total_uploads = Upload.query.count()
-        high_risk = Prediction.query.filter_by(risk_level='High').count()
-        medium_risk = Prediction.query.filter_by(risk_level='Medium').count()
-        low_risk = Prediction.query.filter_by(risk_level='Low').count()
+        # Upload summaries cover archived uploads too, without touching customer rows
+        totals = db.session.query(
+            db.func.count(Upload.id),
+            db.func.coalesce(db.func.sum(Upload.total_customers), 0),
+            db.func.coalesce(db.func.sum(Upload.high_risk_count), 0),
+            db.func.coalesce(db.func.sum(Upload.medium_risk_count), 0),
+            db.func.coalesce(db.func.sum(Upload.low_risk_count), 0)
+        ).one()
+        total_uploads, total_customers, high_risk, medium_risk, low_risk = totals
         
         stats = {
-            'total_customers': total_customers,
-            'total_uploads': total_uploads,
-            'high_risk': high_risk,
-            'medium_risk': medium_risk,
-            'low_risk': low_risk
+            'total_customers': int(total_customers),
+            'total_uploads': int(total_uploads),
+            'high_risk': int(high_risk),
+            'medium_risk': int(medium_risk),
+            'low_risk': int(low_risk)
         }
         
         print(f"📊 API /stats: {stats}")
@@ -432,19 +862,253 @@ def get_stats():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/top-risk')
+def get_top_risk():
+    """
+    Riskiest customers across all uploads, highest churn probability first
+
+    Query params: limit (default 100, max 1000), upload_id, risk_level,
+    start / end (ISO dates, inclusive, on prediction time)
+    """
+    try:
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 1000)
+
+        try:
+            start = request.args.get('start')
+            start = datetime.fromisoformat(start) if start else None
+            end = request.args.get('end')
+            end = datetime.fromisoformat(end) if end else None
+        except ValueError:
+            return jsonify({'error': 'start/end must be ISO dates (YYYY-MM-DD)'}), 400
+        if end is not None and len(request.args['end']) == 10:
+            end = end.replace(hour=23, minute=59, second=59, microsecond=999999)
+
+        # Walks the churn_probability index backwards and stops after `limit` matches
+        query = (db.session.query(Prediction, Customer)
+                 .join(Customer, Customer.id == Prediction.customer_id))
+
+        upload_id = request.args.get('upload_id')
+        if upload_id:
+            query = query.filter(Customer.upload_id == upload_id)
+        risk_level = request.args.get('risk_level')
+        if risk_level:
+            query = query.filter(Prediction.risk_level == risk_level)
+        if start:
+            query = query.filter(Prediction.created_at >= start)
+        if end:
+            query = query.filter(Prediction.created_at <= end)
+
+        rows = query.order_by(Prediction.churn_probability.desc()).limit(limit).all()
+
+        customers = [{**customer.to_dict(), 'prediction': prediction.to_dict()}
+                     for prediction, customer in rows]
+        print(f"📊 API /top-risk: {len(customers)} customers")
+        return jsonify({'customers': customers, 'count': len(customers)})
+
+    except Exception as e:
+        print(f"❌ Error in /api/top-risk: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/analytics')
+def get_analytics():
+    """Merge the stored per-upload aggregates; never touches customer rows"""
+    try:
+        query = UploadAnalytics.query
+        upload_id = request.args.get('upload_id')
+        if upload_id:
+            query = query.filter_by(upload_id=upload_id)
+
+        rows = query.with_entities(UploadAnalytics.aggregates).all()
+        merged = merge_aggregates(json.loads(row.aggregates) for row in rows)
+
+        analytics = summarize_aggregates(merged)
+        analytics['uploads'] = len(rows)
+        return jsonify(analytics)
+
+    except Exception as e:
+        print(f"❌ Error in /api/analytics: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/drift/<upload_id>')
+def get_upload_drift(upload_id):
+    """Drift of one upload against the training distribution, from its stored stats"""
+    try:
+        if drift_reference is None:
+            return jsonify({'error': 'Drift reference not available'}), 503
+
+        row = UploadDrift.query.filter_by(upload_id=upload_id).first()
+        if row is None:
+            return jsonify({'error': 'No drift stats for this upload'}), 404
+
+        stats = json.loads(row.stats)
+        if not is_compatible(stats, drift_reference):
+            return jsonify({'error': 'Drift stats were computed against a different reference'}), 409
+
+        report = drift_report(stats, drift_reference)
+        report['upload_id'] = upload_id
+        report['created_at'] = row.created_at.strftime('%Y-%m-%d %H:%M:%S')
+        return jsonify(report)
+
+    except Exception as e:
+        print(f"❌ Error in /api/drift/{upload_id}: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/drift')
+def get_drift():
+    """
+    Drift over time, merged from stored per-upload stats
+
+    Query parameters (all optional):
+    start / end (ISO dates, inclusive, on upload time)
+    """
+    try:
+        if drift_reference is None:
+            return jsonify({'error': 'Drift reference not available'}), 503
+
+        try:
+            start = request.args.get('start')
+            start = datetime.fromisoformat(start) if start else None
+            end = request.args.get('end')
+            end = datetime.fromisoformat(end) if end else None
+        except ValueError:
+            return jsonify({'error': 'start/end must be ISO dates (YYYY-MM-DD)'}), 400
+        if end is not None and len(request.args['end']) == 10:
+            end = end.replace(hour=23, minute=59, second=59, microsecond=999999)
+
+        query = UploadDrift.query
+        if start:
+            query = query.filter(UploadDrift.created_at >= start)
+        if end:
+            query = query.filter(UploadDrift.created_at <= end)
+
+        rows = query.order_by(UploadDrift.created_at, UploadDrift.id).all()
+
+        uploads = []
+        stats_list = []
+        # Stats binned against an older reference can't be compared or merged
+        skipped = []
+        for row in rows:
+            stats = json.loads(row.stats)
+            if not is_compatible(stats, drift_reference):
+                skipped.append(row.upload_id)
+                continue
+            stats_list.append(stats)
+            report = drift_report(stats, drift_reference)
+            uploads.append({
+                'upload_id': row.upload_id,
+                'created_at': row.created_at.strftime('%Y-%m-%d %H:%M:%S'),
+                'total_customers': report['total_customers'],
+                'max_psi': report['max_psi'],
+                'max_psi_feature': report['max_psi_feature'],
+                'status': report['status'],
+                'psi': {feature: stats['psi'] for feature, stats in report['features'].items()}
+            })
+
+        overall = drift_report(merge_drift_stats(stats_list, drift_reference), drift_reference) if stats_list else None
+        return jsonify({'overall': overall, 'uploads': uploads, 'skipped_uploads': skipped})
+
+    except Exception as e:
+        print(f"❌ Error in /api/drift: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/models')
+def get_models():
+    return jsonify(registry.status())
+
+
+@app.route('/api/models/activate', methods=['POST'])
+def activate_model():
+    """Load, validate and warm a model version, then swap it in; traffic keeps using the old one meanwhile"""
+    try:
+        data = request.get_json(silent=True) or {}
+        version = data.get('version') or registry.latest_version()
+        if not version:
+            return jsonify({'error': 'No model version available'}), 400
+
+        registry.activate(version)
+        return jsonify(registry.status())
+
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        print(f"❌ Model activation error: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/maintenance')
+def get_maintenance():
+    """Retention settings and live database size"""
+    try:
+        status = {
+            'retention_days': app.config['RETENTION_DAYS'],
+            'compaction_interval': app.config['COMPACTION_INTERVAL'],
+            'archive_dir': app.config['ARCHIVE_DIR'],
+            'archived_uploads': Upload.query.filter(Upload.archived_at.isnot(None)).count(),
+            'live_uploads': Upload.query.filter(Upload.archived_at.is_(None)).count(),
+            'compaction_running': compaction_lock.locked()
+        }
+        if db.engine.dialect.name == 'sqlite':
+            with db.engine.connect() as conn:
+                page_size = conn.execute(text('PRAGMA page_size')).scalar()
+                status['db_size_bytes'] = conn.execute(text('PRAGMA page_count')).scalar() * page_size
+                status['free_bytes'] = conn.execute(text('PRAGMA freelist_count')).scalar() * page_size
+        return jsonify(status)
+
+    except Exception as e:
+        print(f"❌ Error in /api/maintenance: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/maintenance/compact', methods=['POST'])
+def compact_now():
+    """Run one compaction pass now; optional JSON body {"retention_days": N}"""
+    try:
+        data = request.get_json(silent=True) or {}
+        retention_days = data.get('retention_days')
+        if retention_days is not None and (
+                isinstance(retention_days, bool) or not isinstance(retention_days, int) or retention_days <= 0):
+            return jsonify({'error': 'retention_days must be a positive integer'}), 400
+        if retention_days is None and app.config['RETENTION_DAYS'] <= 0:
+            return jsonify({'error': 'Retention is disabled (RETENTION_DAYS=0)'}), 400
+
+        result = run_compaction(retention_days)
+        if result is None:
+            return jsonify({'error': 'Compaction already running'}), 409
+        return jsonify(result)
+
+    except Exception as e:
+        print(f"❌ Compaction error: {e}")
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/delete-upload/<upload_id>', methods=['DELETE'])
 def delete_upload(upload_id):
     try:
         print(f"🗑️ Deleting upload: {upload_id}")
         
-        customers = Customer.query.filter_by(upload_id=upload_id).all()
-        for customer in customers:
-            Prediction.query.filter_by(customer_id=customer.id).delete()
+        upload = Upload.query.filter_by(upload_id=upload_id).first()
+        archive_path = upload.archive_path if upload else None
         
-        Customer.query.filter_by(upload_id=upload_id).delete()
+        delete_upload_rows(upload_id)
+        UploadAnalytics.query.filter_by(upload_id=upload_id).delete()
+        UploadDrift.query.filter_by(upload_id=upload_id).delete()
         Upload.query.filter_by(upload_id=upload_id).delete()
+        bump_write_version('uploads')
         
         db.session.commit()
+        if archive_path and os.path.isfile(archive_path):
+            os.remove(archive_path)
         print(f"✅ Upload deleted: {upload_id}")
         
         return jsonify({'success': True})
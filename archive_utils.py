@@ -0,0 +1,67 @@
+"""
+Columnar archive files for uploads moved out of the live database
+Parquet (zstd) when pyarrow is installed, compressed NPZ otherwise; files are
+written to a temporary name and renamed into place, so a crashed compaction
+never leaves a half-written archive behind
+"""
+
+import os
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+
+DEFAULT_ARCHIVE_DIR = 'archive'
+
+PARQUET_EXTENSION = '.parquet'
+NPZ_EXTENSION = '.npz'
+
+
+def write_archive(df, directory, name):
+    """
+    Write a frame as one compressed columnar file
+
+    Args:
+        df (DataFrame): Rows to archive
+        directory (str): Archive directory (created if missing)
+        name (str): File name without extension
+
+    Returns:
+        str: Path of the written archive
+    """
+    os.makedirs(directory, exist_ok=True)
+
+    if HAS_PYARROW:
+        path = os.path.join(directory, name + PARQUET_EXTENSION)
+        tmp_path = path + '.tmp'
+        pq.write_table(pyarrow.Table.from_pandas(df, preserve_index=False), tmp_path, compression='zstd')
+    else:
+        path = os.path.join(directory, name + NPZ_EXTENSION)
+        tmp_path = path + '.tmp'
+        # Non-numeric columns as fixed-width unicode so the file loads without pickle
+        columns = {
+            column: df[column].to_numpy() if df[column].dtype.kind in 'biufcmM' else df[column].to_numpy(dtype=str)
+            for column in df.columns
+        }
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(f, **columns)
+
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_archive(path):
+    """Load an archive written by write_archive back into a DataFrame"""
+    if path.endswith(PARQUET_EXTENSION):
+        if not HAS_PYARROW:
+            raise ValueError('Parquet archives require the pyarrow package')
+        return pq.read_table(path).to_pandas()
+    with np.load(path, allow_pickle=False) as data:
+        return pd.DataFrame({column: data[column] for column in data.files})
@@ -0,0 +1,538 @@
+"""
+Data ingestion helpers for batch uploads
+Declared schema for customer frames: only the columns we score, compact dtypes,
+vectorized validation with a per-upload error report
+"""
+
+import gzip
+import io
+import zipfile
+
+import pandas as pd
+
+try:
+    import zstandard
+    HAS_ZSTD = True
+except ImportError:
+    HAS_ZSTD = False
+
+# Rows parsed and scored at a time; bounds memory on very large uploads
+DEFAULT_CHUNK_SIZE = 5000
+
+
+# ===========================
+# CUSTOMER SCHEMA
+# ===========================
+
+# Canonical column -> accepted header spellings (first match wins)
+COLUMN_ALIASES = {
+    'Gender': ['Gender', 'gender'],
+    'SeniorCitizen': ['SeniorCitizen', 'senior_citizen', 'Senior Citizen'],
+    'Partner': ['Partner', 'partner'],
+    'Dependents': ['Dependents', 'dependents'],
+    'tenure': ['tenure', 'Tenure'],
+    'Contract': ['Contract', 'contract'],
+    'PaymentMethod': ['PaymentMethod', 'payment_method', 'Payment Method'],
+    'MonthlyCharges': ['MonthlyCharges', 'monthly_charges', 'Monthly Charges'],
+    'TotalCharges': ['TotalCharges', 'total_charges', 'Total Charges'],
+    'InternetService': ['InternetService', 'internet_service', 'Internet Service'],
+}
+
+# Low-cardinality strings are held as pandas categoricals
+CATEGORY_COLUMNS = ['Gender', 'Partner', 'Dependents', 'Contract', 'PaymentMethod', 'InternetService']
+
+# Smallest dtype that covers the realistic range of each numeric column; float32
+# keeps cents only up to ~65k, so TotalCharges (up to 1,000,000) stays float64
+NUMERIC_DTYPES = {
+    'SeniorCitizen': 'int8',
+    'tenure': 'int16',
+    'MonthlyCharges': 'float32',
+    'TotalCharges': 'float64',
+}
+
+# Values used when a column is absent or a cell is empty
+COLUMN_DEFAULTS = {
+    'Gender': 'Male',
+    'SeniorCitizen': 0,
+    'Partner': 'No',
+    'Dependents': 'No',
+    'tenure': 12,
+    'Contract': 'Month-to-month',
+    'PaymentMethod': 'Electronic check',
+    'MonthlyCharges': 50.0,
+    'TotalCharges': 500.0,
+    'InternetService': 'No',
+}
+
+CUSTOMER_COLUMNS = list(COLUMN_ALIASES)
+
+# Service fields a trained model may use on top of CUSTOMER_COLUMNS. They are
+# parsed only when the caller asks for them (the active model's
+# optional_columns); when the file lacks one, the model falls back to its
+# training default and validation does not report it missing
+OPTIONAL_COLUMN_ALIASES = {
+    'PhoneService': ['PhoneService', 'phone_service', 'Phone Service'],
+    'MultipleLines': ['MultipleLines', 'multiple_lines', 'Multiple Lines'],
+    'OnlineSecurity': ['OnlineSecurity', 'online_security', 'Online Security'],
+    'OnlineBackup': ['OnlineBackup', 'online_backup', 'Online Backup'],
+    'DeviceProtection': ['DeviceProtection', 'device_protection', 'Device Protection'],
+    'TechSupport': ['TechSupport', 'tech_support', 'Tech Support'],
+    'StreamingTV': ['StreamingTV', 'streaming_tv', 'Streaming TV'],
+    'StreamingMovies': ['StreamingMovies', 'streaming_movies', 'Streaming Movies'],
+    'PaperlessBilling': ['PaperlessBilling', 'paperless_billing', 'Paperless Billing'],
+}
+
+OPTIONAL_COLUMNS = list(OPTIONAL_COLUMN_ALIASES)
+
+_ALIAS_LOOKUP = {
+    alias: canonical
+    for aliases_by_column in (COLUMN_ALIASES, OPTIONAL_COLUMN_ALIASES)
+    for canonical, aliases in aliases_by_column.items()
+    for alias in aliases
+}
+
+
+def resolve_columns(header, optional_columns=()):
+    """
+    Map the columns of an uploaded header to canonical names
+
+    Args:
+        header (iterable): Column names as they appear in the file
+        optional_columns (iterable): OPTIONAL_COLUMNS to keep as well
+
+    Returns:
+        dict: {header_name: canonical_name} for the columns we use, one per canonical column
+    """
+    wanted = set(CUSTOMER_COLUMNS).union(optional_columns)
+    resolved = {}
+    seen = set()
+    for name in header:
+        canonical = _ALIAS_LOOKUP.get(str(name).strip())
+        if canonical in wanted and canonical not in seen:
+            resolved[name] = canonical
+            seen.add(canonical)
+    return resolved
+
+
+def normalize_customer_frame(df, optional_columns=()):
+    """
+    Keep only the columns we score, renamed to their canonical names
+
+    Values are left untouched; see validate_customer_frame for type checks and casting.
+    """
+    resolved = resolve_columns(df.columns, optional_columns)
+    return df[list(resolved)].rename(columns=resolved)
+
+
+# ===========================
+# VALIDATION
+# ===========================
+
+VALIDATION_POLICIES = ('default', 'skip', 'reject')
+
+# Accepted values per categorical column (matched case-insensitively)
+ALLOWED_VALUES = {
+    'Gender': ['Male', 'Female'],
+    'Partner': ['Yes', 'No'],
+    'Dependents': ['Yes', 'No'],
+    'Contract': ['Month-to-month', 'One year', 'Two year'],
+    'PaymentMethod': ['Electronic check', 'Mailed check', 'Bank transfer (automatic)', 'Credit card (automatic)'],
+    'InternetService': ['DSL', 'Fiber optic', 'No'],
+}
+
+OPTIONAL_ALLOWED_VALUES = {
+    'PhoneService': ['Yes', 'No'],
+    'MultipleLines': ['Yes', 'No', 'No phone service'],
+    'OnlineSecurity': ['Yes', 'No', 'No internet service'],
+    'OnlineBackup': ['Yes', 'No', 'No internet service'],
+    'DeviceProtection': ['Yes', 'No', 'No internet service'],
+    'TechSupport': ['Yes', 'No', 'No internet service'],
+    'StreamingTV': ['Yes', 'No', 'No internet service'],
+    'StreamingMovies': ['Yes', 'No', 'No internet service'],
+    'PaperlessBilling': ['Yes', 'No'],
+}
+
+# Inclusive (min, max) per numeric column
+NUMERIC_RANGES = {
+    'SeniorCitizen': (0, 1),
+    'tenure': (0, 120),
+    'MonthlyCharges': (0, 1000),
+    'TotalCharges': (0, 1000000),
+}
+
+INTEGER_COLUMNS = ['SeniorCitizen', 'tenure']
+
+# Row-level errors kept in a report; counts are always exact
+MAX_REPORTED_ERRORS = 100
+
+
+class ValidationReport:
+    """Per-upload validation summary: exact counts plus the first row-level errors"""
+
+    def __init__(self, policy='default', max_errors=MAX_REPORTED_ERRORS):
+        if policy not in VALIDATION_POLICIES:
+            raise ValueError(f"Unknown validation policy '{policy}', expected one of {VALIDATION_POLICIES}")
+        self.policy = policy
+        self.max_errors = max_errors
+        self.missing_columns = []
+        self.error_counts = {}
+        self.errors = []
+        self.rows_checked = 0
+        self.rows_skipped = 0
+        self.cells_defaulted = 0
+
+    @property
+    def total_errors(self):
+        return sum(self.error_counts.values())
+
+    @property
+    def rejected(self):
+        """True when the upload must not be saved under the active policy"""
+        if self.policy == 'default':
+            return False
+        return bool(self.missing_columns) or (self.policy == 'reject' and self.total_errors > 0)
+
+    def add(self, column, reason, mask, values):
+        """Record the rows flagged by a boolean mask for one column/reason"""
+        count = int(mask.sum())
+        if count == 0:
+            return
+        key = f'{column}: {reason}'
+        self.error_counts[key] = self.error_counts.get(key, 0) + count
+
+        room = self.max_errors - len(self.errors)
+        if room > 0:
+            flagged = values[mask].head(room)
+            for row_index, value in flagged.items():
+                self.errors.append({
+                    'row': int(row_index) + 1,
+                    'column': column,
+                    'value': None if pd.isna(value) else str(value),
+                    'reason': reason
+                })
+
+    def to_dict(self):
+        return {
+            'policy': self.policy,
+            'rows_checked': self.rows_checked,
+            'rows_skipped': self.rows_skipped,
+            'cells_defaulted': self.cells_defaulted,
+            'missing_columns': self.missing_columns,
+            'total_errors': self.total_errors,
+            'error_counts': self.error_counts,
+            'errors': self.errors,
+            'errors_truncated': self.total_errors > len(self.errors)
+        }
+
+
+def _check_categorical(values, column, report):
+    """Match categories case-insensitively against the allowed values; work is O(#categories)"""
+    if not isinstance(values.dtype, pd.CategoricalDtype):
+        values = values.astype('category')
+
+    allowed_values = ALLOWED_VALUES.get(column) or OPTIONAL_ALLOWED_VALUES[column]
+    lookup = {allowed.lower(): allowed for allowed in allowed_values}
+    mapping = {category: lookup.get(str(category).strip().lower()) for category in values.cat.categories}
+    cleaned = pd.Series(
+        pd.Categorical(values.map(mapping), categories=allowed_values),
+        index=values.index
+    )
+
+    missing = values.isna()
+    invalid = cleaned.isna() & ~missing
+    report.add(column, 'missing value', missing, values)
+    report.add(column, 'not an allowed value', invalid, values)
+    return cleaned, missing | invalid
+
+
+def _check_numeric(values, column, report):
+    """Coerce to numbers and flag non-numeric, fractional and out-of-range cells"""
+    cleaned = pd.to_numeric(values, errors='coerce')
+
+    missing = values.isna()
+    not_number = cleaned.isna() & ~missing
+    report.add(column, 'missing value', missing, values)
+    report.add(column, 'not a number', not_number, values)
+
+    low, high = NUMERIC_RANGES[column]
+    out_of_range = cleaned.notna() & ((cleaned < low) | (cleaned > high))
+    report.add(column, f'out of range [{low}, {high}]', out_of_range, values)
+    bad = missing | not_number | out_of_range
+
+    if column in INTEGER_COLUMNS:
+        fractional = cleaned.notna() & ~bad & (cleaned % 1 != 0)
+        report.add(column, 'not a whole number', fractional, values)
+        bad = bad | fractional
+
+    return cleaned.where(~bad), bad
+
+
+def validate_customer_frame(df, report, return_imputed=False):
+    """
+    Validate a normalized chunk column-by-column and apply the report's policy
+
+    All checks are vectorized over whole columns. Bad cells are handled per policy:
+        default - replace with COLUMN_DEFAULTS and keep the row
+        skip    - drop the row
+        reject  - flag the upload (report.rejected); the caller must not save it
+    A missing column is filled with its default under 'default' and rejects the
+    upload otherwise. OPTIONAL_COLUMNS present in the frame are checked the same
+    way, but have no default here: their bad cells are left empty for the model
+    to fill, and an absent one is neither reported nor added.
+
+    Args:
+        df (DataFrame): Output of normalize_customer_frame
+        report (ValidationReport): Accumulates errors across chunks
+        return_imputed (bool): Also return which cells were filled with defaults
+
+    Returns:
+        DataFrame: CUSTOMER_COLUMNS plus the optional columns present, categoricals
+            + compact numeric dtypes; with return_imputed, a (frame, boolean mask frame) tuple
+    """
+    report.rows_checked += len(df)
+    bad_rows = pd.Series(False, index=df.index)
+    columns = {}
+    imputed = {}
+
+    for col in CUSTOMER_COLUMNS:
+        if col not in df.columns:
+            if col not in report.missing_columns:
+                report.missing_columns.append(col)
+            values = pd.Series(pd.NA, index=df.index, dtype='object')
+            bad = pd.Series(False, index=df.index)
+            report.cells_defaulted += len(df) if report.policy == 'default' else 0
+            imputed[col] = pd.Series(True, index=df.index)
+        elif col in CATEGORY_COLUMNS:
+            values, bad = _check_categorical(df[col], col, report)
+        else:
+            values, bad = _check_numeric(df[col], col, report)
+
+        if report.policy == 'default':
+            report.cells_defaulted += int(bad.sum())
+        bad_rows |= bad
+        columns[col] = values
+        imputed.setdefault(col, bad)
+
+    for col in OPTIONAL_COLUMNS:
+        if col in df.columns:
+            values, bad = _check_categorical(df[col], col, report)
+            if report.policy == 'default':
+                report.cells_defaulted += int(bad.sum())
+            bad_rows |= bad
+            columns[col] = values
+            imputed[col] = bad
+
+    result = pd.DataFrame(columns, index=df.index)
+    imputed = pd.DataFrame(imputed, index=df.index)
+    if report.policy == 'skip':
+        report.rows_skipped += int(bad_rows.sum())
+        result = result[~bad_rows]
+        imputed = imputed[~bad_rows]
+
+    for col in CUSTOMER_COLUMNS:
+        default = COLUMN_DEFAULTS[col]
+        if col in CATEGORY_COLUMNS:
+            result[col] = pd.Categorical(result[col], categories=ALLOWED_VALUES[col]).fillna(default)
+        else:
+            result[col] = result[col].fillna(default).astype(NUMERIC_DTYPES[col])
+
+    if return_imputed:
+        return result, imputed
+    return result
+
+
+def iter_csv_chunks(source, chunksize=DEFAULT_CHUNK_SIZE, optional_columns=()):
+    """
+    Stream an uploaded CSV in normalized chunks using the declared customer schema
+
+    Only the columns we score are parsed (usecols) and string columns are parsed
+    straight into categoricals. The pyarrow engine cannot read in chunks, so the
+    C parser is used to keep memory bounded by the chunk size.
+
+    Args:
+        source: File-like object or path
+        chunksize (int): Rows per chunk
+        optional_columns (iterable): OPTIONAL_COLUMNS to parse as well
+
+    Yields:
+        DataFrame: Normalized (unvalidated) customer frame, indexed by data row number
+    """
+    wanted = set(CUSTOMER_COLUMNS).union(optional_columns)
+    reader = pd.read_csv(
+        source,
+        usecols=lambda name: _ALIAS_LOOKUP.get(str(name).strip()) in wanted,
+        dtype={alias: 'category' for alias, canonical in _ALIAS_LOOKUP.items()
+               if canonical in CATEGORY_COLUMNS or canonical in OPTIONAL_COLUMN_ALIASES},
+        na_values=[' '],
+        chunksize=chunksize
+    )
+    with reader:
+        for chunk in reader:
+            yield normalize_customer_frame(chunk, optional_columns)
+
+
+def _iter_row_chunks(rows, chunksize, optional_columns=()):
+    """
+    Group (header-first) row tuples from a spreadsheet into normalized frames
+
+    Blank rows are dropped, but frames stay indexed by source position (data row
+    number, 0-based after the header), so validation errors point at the right
+    spreadsheet row.
+    """
+    header = next(rows, None)
+    if header is None:
+        return
+
+    resolved = resolve_columns((name for name in header if name is not None), optional_columns)
+    positions = [i for i, name in enumerate(header) if name in resolved]
+    columns = [resolved[header[i]] for i in positions]
+
+    buffer = []
+    index = []
+    for row_number, row in enumerate(rows):
+        if row is None or all(value is None or value == '' for value in row):
+            continue
+        buffer.append([row[i] if i < len(row) else None for i in positions])
+        index.append(row_number)
+        if len(buffer) >= chunksize:
+            yield normalize_customer_frame(pd.DataFrame(buffer, columns=columns, index=pd.Index(index)),
+                                           optional_columns)
+            buffer = []
+            index = []
+
+    if buffer:
+        yield normalize_customer_frame(pd.DataFrame(buffer, columns=columns, index=pd.Index(index)),
+                                       optional_columns)
+
+
+def iter_xlsx_chunks(source, chunksize=DEFAULT_CHUNK_SIZE, optional_columns=()):
+    """
+    Stream rows of the first worksheet of an .xlsx workbook in normalized chunks
+
+    openpyxl's read-only mode parses the sheet XML lazily, so only one chunk of
+    rows is materialized at a time regardless of the workbook size.
+    """
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        yield from _iter_row_chunks(sheet.iter_rows(values_only=True), chunksize, optional_columns)
+    finally:
+        workbook.close()
+
+
+def iter_xls_chunks(source, chunksize=DEFAULT_CHUNK_SIZE, optional_columns=()):
+    """
+    Stream rows of the first sheet of a legacy .xls workbook in normalized chunks
+
+    The BIFF format has no streaming reader, but sheets are capped at 65,536 rows
+    and on_demand loading keeps the other sheets unparsed.
+    """
+    import xlrd
+
+    contents = source.read() if hasattr(source, 'read') else open(source, 'rb').read()
+    workbook = xlrd.open_workbook(file_contents=contents, on_demand=True)
+    try:
+        sheet = workbook.sheet_by_index(0)
+        rows = (tuple(sheet.row_values(i)) for i in range(sheet.nrows))
+        yield from _iter_row_chunks(rows, chunksize, optional_columns)
+    finally:
+        workbook.release_resources()
+
+
+EXCEL_EXTENSIONS = ('.xlsx', '.xlsm')
+LEGACY_EXCEL_EXTENSIONS = ('.xls',)
+
+# Magic numbers of the compression formats we accept
+GZIP_MAGIC = b'\x1f\x8b'
+ZIP_MAGIC = b'PK\x03\x04'
+ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+COMPRESSION_EXTENSIONS = ('.gz', '.gzip', '.zip', '.zst', '.zstd')
+
+
+def _peek(stream, size):
+    """Return the first bytes of a stream without consuming them"""
+    if hasattr(stream, 'peek'):
+        return stream.peek(size)[:size]
+    position = stream.tell()
+    head = stream.read(size)
+    stream.seek(position)
+    return head
+
+
+def _strip_compression_suffix(name):
+    for suffix in COMPRESSION_EXTENSIONS:
+        if name.endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def open_upload_stream(source, filename):
+    """
+    Detect a compressed upload and wrap it in a streaming decompressor
+
+    gzip, zip (first file member) and zstd (when the zstandard package is
+    installed) are detected from their magic bytes. Data is decompressed
+    incrementally as the parser reads, so the uncompressed file is never
+    written to disk or held in memory as a whole. Excel workbooks are zip
+    containers themselves and are passed through untouched.
+
+    Args:
+        source: Binary file-like object (e.g. werkzeug FileStorage)
+        filename (str): Original upload name
+
+    Returns:
+        tuple: (stream, filename) of the decompressed payload
+    """
+    name = (filename or '').lower()
+    stream = getattr(source, 'stream', source)
+    if not (hasattr(stream, 'peek') or stream.seekable()):
+        stream = io.BufferedReader(stream)
+
+    if name.endswith(EXCEL_EXTENSIONS):
+        return stream, name
+
+    head = _peek(stream, 4)
+
+    if head.startswith(GZIP_MAGIC):
+        return gzip.GzipFile(fileobj=stream, mode='rb'), _strip_compression_suffix(name)
+
+    if head.startswith(ZIP_MAGIC):
+        archive = zipfile.ZipFile(stream)
+        members = [info for info in archive.infolist()
+                   if not info.is_dir() and not info.filename.startswith('__MACOSX/')]
+        if not members:
+            raise ValueError('Zip archive contains no files')
+        return archive.open(members[0]), members[0].filename.lower()
+
+    if head.startswith(ZSTD_MAGIC):
+        if not HAS_ZSTD:
+            raise ValueError('zstd uploads require the zstandard package')
+        return zstandard.ZstdDecompressor().stream_reader(stream), _strip_compression_suffix(name)
+
+    return stream, name
+
+
+def iter_customer_chunks(source, filename, chunksize=DEFAULT_CHUNK_SIZE, optional_columns=()):
+    """
+    Stream an uploaded customer file in normalized chunks, dispatching on file type
+
+    Compressed uploads are decompressed on the fly (see open_upload_stream).
+
+    Args:
+        source: File-like object (e.g. werkzeug FileStorage)
+        filename (str): Original upload name, used to pick the reader
+        chunksize (int): Rows per chunk
+        optional_columns (iterable): OPTIONAL_COLUMNS to keep, e.g. the active model's
+
+    Yields:
+        DataFrame: Normalized (unvalidated) customer frame per chunk
+    """
+    stream, name = open_upload_stream(source, filename)
+    if name.endswith(EXCEL_EXTENSIONS):
+        return iter_xlsx_chunks(stream, chunksize, optional_columns)
+    if name.endswith(LEGACY_EXCEL_EXTENSIONS):
+        return iter_xls_chunks(stream, chunksize, optional_columns)
+    return iter_csv_chunks(stream, chunksize, optional_columns)
@@ -0,0 +1,285 @@
+"""
+Feature drift monitoring against the training distribution
+Uploads are summarized chunk by chunk into fixed-bin histograms, category
+counts and streaming mean/variance (Chan et al. parallel update), so drift
+per upload or over any set of uploads costs O(bins) and never rescans customers
+"""
+
+import hashlib
+import json
+
+import numpy as np
+import pandas as pd
+
+from data_utils import (
+    ALLOWED_VALUES, DEFAULT_CHUNK_SIZE, ValidationReport, iter_customer_chunks, validate_customer_frame
+)
+
+
+# Features binned on deciles of the reference data
+NUMERIC_FEATURES = ['tenure', 'MonthlyCharges', 'TotalCharges']
+
+# Features compared by category frequency
+CATEGORICAL_FEATURES = list(ALLOWED_VALUES) + ['SeniorCitizen']
+
+REFERENCE_QUANTILES = np.linspace(0.1, 0.9, 9)
+
+# Floor for empty bins so PSI stays finite
+PSI_EPSILON = 1e-4
+
+# Conventional PSI bands: < 0.1 stable, < 0.25 moderate shift, otherwise significant
+PSI_THRESHOLDS = [(0.1, 'stable'), (0.25, 'moderate')]
+PSI_SIGNIFICANT = 'significant'
+
+# Status of a feature with no observed (non-imputed) values
+NO_DATA = 'insufficient data'
+
+
+def _categories(feature):
+    return ['0', '1'] if feature == 'SeniorCitizen' else ALLOWED_VALUES[feature]
+
+
+def reference_fingerprint(reference):
+    """Hash of the bins and categories stats are counted into; stats only combine within one fingerprint"""
+    layout = {
+        'edges': {feature: reference['numeric'][feature]['edges'] for feature in NUMERIC_FEATURES},
+        'categories': {feature: _categories(feature) for feature in CATEGORICAL_FEATURES}
+    }
+    return hashlib.sha1(json.dumps(layout, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def is_compatible(stats, reference):
+    """True when `stats` were counted with the same bins as `reference`"""
+    return stats.get('reference') == reference['fingerprint']
+
+
+def _check_compatible(fingerprint, stats):
+    if stats.get('reference') != fingerprint:
+        raise ValueError('Drift stats were binned against a different reference')
+
+
+def empty_drift_stats(reference):
+    """Stats of an empty upload, binned like `reference`; the identity for merging"""
+    return {
+        'reference': reference['fingerprint'],
+        'total': 0,
+        'numeric': {
+            feature: {
+                'counts': [0] * (len(reference['numeric'][feature]['edges']) + 1),
+                'n': 0,
+                'mean': 0.0,
+                'm2': 0.0
+            }
+            for feature in NUMERIC_FEATURES
+        },
+        'categorical': {
+            feature: {value: 0 for value in _categories(feature)}
+            for feature in CATEGORICAL_FEATURES
+        },
+        # Cells filled with defaults by validation, left out of the stats above
+        'imputed': {feature: 0 for feature in NUMERIC_FEATURES + CATEGORICAL_FEATURES}
+    }
+
+
+def compute_drift_stats(chunk, reference, imputed=None):
+    """
+    Summarize one validated chunk with the reference's bin edges
+
+    Cells that validation filled with defaults are a data-quality issue, not
+    drift, so they are counted separately and left out of the distributions.
+
+    Args:
+        chunk (DataFrame): Validated customer frame (see data_utils.validate_customer_frame)
+        reference (dict): Reference profile from build_reference
+        imputed (DataFrame): Optional boolean mask of defaulted cells, aligned with chunk
+
+    Returns:
+        dict: Additive drift stats (see empty_drift_stats for the layout)
+    """
+    stats = empty_drift_stats(reference)
+    stats['total'] = int(len(chunk))
+    if chunk.empty:
+        return stats
+
+    def observed(feature):
+        if imputed is None or feature not in imputed.columns:
+            return chunk[feature]
+        mask = imputed[feature].to_numpy(dtype=bool)
+        stats['imputed'][feature] = int(mask.sum())
+        return chunk[feature][~mask]
+
+    for feature in NUMERIC_FEATURES:
+        values = pd.to_numeric(observed(feature), errors='coerce').to_numpy(dtype=float)
+        values = values[np.isfinite(values)]
+        edges = reference['numeric'][feature]['edges']
+        bins = np.searchsorted(edges, values, side='right')
+        stats['numeric'][feature] = {
+            'counts': np.bincount(bins, minlength=len(edges) + 1).tolist(),
+            'n': int(len(values)),
+            'mean': float(values.mean()) if len(values) else 0.0,
+            'm2': float(((values - values.mean()) ** 2).sum()) if len(values) else 0.0
+        }
+
+    for feature in CATEGORICAL_FEATURES:
+        counts = observed(feature).astype(str).value_counts()
+        stats['categorical'][feature] = {value: int(counts.get(value, 0)) for value in _categories(feature)}
+
+    return stats
+
+
+def _merge_moments(a, b):
+    """Combine two (n, mean, M2) summaries in one step (Chan et al.)"""
+    n = a['n'] + b['n']
+    if n == 0:
+        return 0, 0.0, 0.0
+    delta = b['mean'] - a['mean']
+    mean = a['mean'] + delta * b['n'] / n
+    m2 = a['m2'] + b['m2'] + delta * delta * a['n'] * b['n'] / n
+    return n, mean, m2
+
+
+def update_drift_stats(stats, other):
+    """Fold `other` into `stats` in place and return `stats`; raises ValueError if their bins differ"""
+    _check_compatible(stats.get('reference'), other)
+    stats['total'] += other['total']
+    for feature, target in stats['numeric'].items():
+        source = other['numeric'][feature]
+        target['counts'] = [a + b for a, b in zip(target['counts'], source['counts'])]
+        target['n'], target['mean'], target['m2'] = _merge_moments(target, source)
+    for feature, target in stats['categorical'].items():
+        for value, count in other['categorical'][feature].items():
+            target[value] = target.get(value, 0) + count
+    for feature, count in other.get('imputed', {}).items():
+        stats['imputed'][feature] = stats['imputed'].get(feature, 0) + count
+    return stats
+
+
+def merge_drift_stats(stats_list, reference):
+    """Sum any number of drift stats (chunks of one upload, or several uploads)"""
+    merged = empty_drift_stats(reference)
+    for stats in stats_list:
+        update_drift_stats(merged, stats)
+    return merged
+
+
+def build_reference(path, chunksize=DEFAULT_CHUNK_SIZE):
+    """
+    Profile the training data: decile bin edges plus the same stats as an upload
+
+    Returns:
+        dict: {'path', 'numeric': {feature: {'edges'}}, 'fingerprint', 'stats'}
+    """
+    report = ValidationReport('default')
+    with open(path, 'rb') as f:
+        validated = [validate_customer_frame(chunk, report, return_imputed=True)
+                     for chunk in iter_customer_chunks(f, path, chunksize)]
+    data = pd.concat([chunk for chunk, _ in validated], ignore_index=True)
+    imputed = pd.concat([mask for _, mask in validated], ignore_index=True)
+
+    # Defaulted cells are left out of the edges and stats, as they are for uploads
+    reference = {'path': path, 'numeric': {}}
+    for feature in NUMERIC_FEATURES:
+        values = data[feature][~imputed[feature]].to_numpy(dtype=float)
+        reference['numeric'][feature] = {'edges': np.unique(np.quantile(values, REFERENCE_QUANTILES)).tolist()}
+    reference['fingerprint'] = reference_fingerprint(reference)
+
+    reference['stats'] = compute_drift_stats(data, reference, imputed)
+    return reference
+
+
+def _proportions(counts):
+    counts = np.asarray(counts, dtype=float)
+    total = counts.sum()
+    proportions = counts / total if total else np.zeros_like(counts)
+    return np.maximum(proportions, PSI_EPSILON)
+
+
+def population_stability_index(expected_counts, actual_counts):
+    """PSI = sum((actual - expected) * ln(actual / expected)) over matching bins"""
+    expected = _proportions(expected_counts)
+    actual = _proportions(actual_counts)
+    return float(np.sum((actual - expected) * np.log(actual / expected)))
+
+
+def psi_status(psi):
+    if psi is None:
+        return NO_DATA
+    for threshold, label in PSI_THRESHOLDS:
+        if psi < threshold:
+            return label
+    return PSI_SIGNIFICANT
+
+
+def _std(moments):
+    return float(np.sqrt(moments['m2'] / (moments['n'] - 1))) if moments['n'] > 1 else 0.0
+
+
+def drift_report(stats, reference):
+    """
+    Compare upload stats with the reference profile
+
+    Features with no observed values (e.g. a column missing from the upload)
+    get no PSI and the 'insufficient data' status. Raises ValueError when the
+    stats were binned against a different reference.
+
+    Returns:
+        dict: Per-feature PSI and status, numeric mean/std shifts, category
+            frequency shifts (percentage points), imputed cell counts, and the
+            worst feature overall
+    """
+    _check_compatible(reference['fingerprint'], stats)
+    expected = reference['stats']
+    imputed = stats.get('imputed', {})
+    features = {}
+
+    def psi_or_none(expected_counts, actual_counts):
+        if not sum(actual_counts):
+            return None
+        return population_stability_index(expected_counts, actual_counts)
+
+    for feature in NUMERIC_FEATURES:
+        actual, base = stats['numeric'][feature], expected['numeric'][feature]
+        psi = psi_or_none(base['counts'], actual['counts'])
+        base_std = _std(base)
+        features[feature] = {
+            'type': 'numeric',
+            'psi': round(psi, 4) if psi is not None else None,
+            'status': psi_status(psi),
+            'imputed_cells': imputed.get(feature, 0),
+            'mean': round(actual['mean'], 2) if actual['n'] else None,
+            'reference_mean': round(base['mean'], 2),
+            'std': round(_std(actual), 2) if actual['n'] else None,
+            'reference_std': round(base_std, 2),
+            # Mean shift in reference standard deviations
+            'mean_shift': round((actual['mean'] - base['mean']) / base_std, 3) if base_std and actual['n'] else 0.0
+        }
+
+    for feature in CATEGORICAL_FEATURES:
+        actual, base = stats['categorical'][feature], expected['categorical'][feature]
+        values = list(base)
+        psi = psi_or_none([base[v] for v in values], [actual.get(v, 0) for v in values])
+        actual_total, base_total = sum(actual.values()), sum(base.values())
+        features[feature] = {
+            'type': 'categorical',
+            'psi': round(psi, 4) if psi is not None else None,
+            'status': psi_status(psi),
+            'imputed_cells': imputed.get(feature, 0),
+            'frequency_shift': {
+                value: round(
+                    ((actual.get(value, 0) / actual_total if actual_total else 0)
+                     - (base[value] / base_total if base_total else 0)) * 100, 1
+                )
+                for value in values
+            }
+        }
+
+    measured = [feature for feature in features if features[feature]['psi'] is not None]
+    worst = max(measured, key=lambda feature: features[feature]['psi']) if measured else None
+    return {
+        'total_customers': stats['total'],
+        'reference_customers': expected['total'],
+        'max_psi': features[worst]['psi'] if worst else None,
+        'max_psi_feature': worst,
+        'status': features[worst]['status'] if worst else NO_DATA,
+        'features': features
+    }
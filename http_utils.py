@@ -0,0 +1,106 @@
+"""
+HTTP helpers for large payloads
+Fast JSON serialization (orjson when installed), gzip/brotli response
+compression and a compact columnar layout for row lists
+"""
+
+import gzip
+
+from flask import request
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+    HAS_ORJSON = True
+except ImportError:
+    HAS_ORJSON = False
+
+try:
+    import brotli
+    HAS_BROTLI = True
+except ImportError:
+    HAS_BROTLI = False
+
+
+# Responses smaller than this are not worth compressing
+DEFAULT_COMPRESS_MIN_SIZE = 1024
+
+COMPRESSIBLE_MIMETYPES = ('application/json', 'text/csv')
+
+
+class OrjsonProvider(DefaultJSONProvider):
+    """JSON provider that serializes with orjson, falling back to Flask's encoder for unknown types"""
+
+    options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY if HAS_ORJSON else 0
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, default=self.default, option=self.options).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        # Skip the bytes -> str -> bytes round trip of dumps()
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=self.options),
+            mimetype=self.mimetype
+        )
+
+
+def compress_response(response, min_size=DEFAULT_COMPRESS_MIN_SIZE):
+    """
+    Compress a JSON/CSV response with the best encoding the client accepts
+
+    Brotli is preferred when the brotli package is installed, gzip otherwise.
+    Streaming, already-encoded and small responses are returned untouched.
+    """
+    response.vary.add('Accept-Encoding')
+
+    if (response.status_code != 200 or response.direct_passthrough
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES
+            or 'Content-Encoding' in response.headers
+            or (response.content_length or 0) < min_size):
+        return response
+
+    accepted = request.accept_encodings
+    if HAS_BROTLI and accepted['br']:
+        encoding, compress = 'br', lambda data: brotli.compress(data, quality=4)
+    elif accepted['gzip']:
+        encoding, compress = 'gzip', lambda data: gzip.compress(data, compresslevel=5)
+    else:
+        return response
+
+    response.set_data(compress(response.get_data()))
+    response.headers['Content-Encoding'] = encoding
+
+    # The compressed body is a different representation of the same resource
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+    return response
+
+
+def init_http(app):
+    """Install the fast JSON provider (if available) and response compression on an app"""
+    if HAS_ORJSON:
+        app.json = OrjsonProvider(app)
+
+    app.config.setdefault('COMPRESS_MIN_SIZE', DEFAULT_COMPRESS_MIN_SIZE)
+
+    @app.after_request
+    def _compress(response):
+        return compress_response(response, app.config['COMPRESS_MIN_SIZE'])
+
+
+def to_columnar(rows):
+    """
+    Convert a list of dicts with the same keys into {field: [values...]}
+
+    Field names are sent once instead of once per row, which roughly halves
+    the payload for wide rows of short values.
+    """
+    if not rows:
+        return {}
+    return {field: [row[field] for row in rows] for field in rows[0]}
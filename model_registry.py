@@ -0,0 +1,449 @@
+"""
+Versioned model registry with hot reload
+Artifact sets written by train_model.py live in models/registry/<version>/;
+a new version is loaded, validated and warmed off the request path and then
+swapped in atomically, so live traffic never sees a half-loaded model
+"""
+
+import json
+import os
+import pickle
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_utils import OPTIONAL_COLUMNS
+
+
+REGISTRY_DIR = os.path.join('models', 'registry')
+LATEST_FILE = 'LATEST'
+MANIFEST_FILE = 'manifest.json'
+COMPACT_FILE = 'compact_model.json'
+
+# Version reported when no trained artifact set is available
+RULES_VERSION = 'rules-v1'
+
+# Upload column -> training feature name, where they differ
+FEATURE_SOURCES = {'gender': 'Gender'}
+
+# Known customers used to validate and warm a version before it goes live
+WARMUP_CUSTOMERS = [
+    {'Gender': 'Female', 'SeniorCitizen': 1, 'Partner': 'No', 'Dependents': 'No', 'tenure': 2,
+     'Contract': 'Month-to-month', 'PaymentMethod': 'Electronic check', 'MonthlyCharges': 95.0,
+     'TotalCharges': 190.0, 'InternetService': 'Fiber optic'},
+    {'Gender': 'Male', 'SeniorCitizen': 0, 'Partner': 'Yes', 'Dependents': 'Yes', 'tenure': 48,
+     'Contract': 'Two year', 'PaymentMethod': 'Credit card (automatic)', 'MonthlyCharges': 45.0,
+     'TotalCharges': 2160.0, 'InternetService': 'DSL'},
+]
+
+
+def _load_pickle(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+def _load_manifest(path):
+    with open(os.path.join(path, MANIFEST_FILE)) as f:
+        return json.load(f)
+
+
+def _expit(x):
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def _path_contribution_table(tree, node_value, n_features):
+    """
+    Cumulative path contributions for every node of one fitted tree
+
+    Row `node` holds, per feature, the change in node value accumulated along the
+    root -> node path at splits on that feature, so a sample's contributions are
+    the row of the leaf it lands in. Nodes are stored parent-before-child, so one
+    forward pass fills the table.
+    """
+    table = np.zeros((tree.node_count, n_features), dtype=np.float32)
+    for parent in range(tree.node_count):
+        feature = tree.feature[parent]
+        for child in (tree.children_left[parent], tree.children_right[parent]):
+            if child != -1:
+                table[child] = table[parent]
+                table[child, feature] += node_value[child] - node_value[parent]
+    return table
+
+
+class TreeAttribution:
+    """
+    Path-based contributions for the RF + GB ensemble, built once per version
+
+    Scoring goes through the per-tree leaf indices (`apply`), so the
+    probabilities and their attribution come out of the same traversal. GB
+    contributions are additive in log-odds; each row is rescaled so they sum to
+    the change in probability from the GB base rate.
+    """
+
+    def __init__(self, rf_model, gb_model, n_features):
+        self.rf_model = rf_model
+        self.gb_model = gb_model
+
+        self.rf_tables = []
+        self.rf_bias = 0.0
+        for estimator in rf_model.estimators_:
+            counts = estimator.tree_.value[:, 0, :]
+            node_value = counts[:, 1] / counts.sum(axis=1)
+            self.rf_tables.append(_path_contribution_table(estimator.tree_, node_value, n_features))
+            self.rf_bias += node_value[0]
+        self.rf_tables = [table / len(rf_model.estimators_) for table in self.rf_tables]
+        self.rf_bias /= len(rf_model.estimators_)
+
+        if isinstance(gb_model.init_, str) and gb_model.init_ == 'zero':
+            self.gb_bias = 0.0
+        else:
+            prior = gb_model.init_.predict_proba(np.zeros((1, n_features)))[0, 1]
+            self.gb_bias = float(np.log(prior / (1 - prior)))
+        self.gb_tables = []
+        for estimator in gb_model.estimators_[:, 0]:
+            node_value = estimator.tree_.value[:, 0, 0] * gb_model.learning_rate
+            self.gb_tables.append(_path_contribution_table(estimator.tree_, node_value, n_features))
+            self.gb_bias += node_value[0]
+
+    def explain(self, X):
+        """
+        Returns:
+            tuple: (churn probabilities, base probability, contributions of shape (n, features))
+        """
+        n, n_features = X.shape
+
+        rf_contributions = np.zeros((n, n_features))
+        for table, leaves in zip(self.rf_tables, self.rf_model.apply(X).T):
+            rf_contributions += table[leaves]
+        rf_probs = self.rf_bias + rf_contributions.sum(axis=1)
+
+        raw_contributions = np.zeros((n, n_features))
+        for table, leaves in zip(self.gb_tables, self.gb_model.apply(X)[:, :, 0].T.astype(np.intp)):
+            raw_contributions += table[leaves]
+        raw_delta = raw_contributions.sum(axis=1)
+        gb_base = _expit(self.gb_bias)
+        gb_probs = _expit(self.gb_bias + raw_delta)
+
+        # Log-odds -> probability: scale each row by its secant slope (the
+        # derivative at the base rate when the row barely moves)
+        flat = np.abs(raw_delta) < 1e-9
+        slope = np.where(flat, gb_base * (1 - gb_base), (gb_probs - gb_base) / np.where(flat, 1.0, raw_delta))
+        gb_contributions = raw_contributions * slope[:, None]
+
+        probs = (rf_probs + gb_probs) / 2
+        base = (self.rf_bias + gb_base) / 2
+        return probs, float(base), (rf_contributions + gb_contributions) / 2
+
+
+class CompactModel:
+    """
+    Distilled low-latency tier: one shallow regression tree over the upload fields
+
+    The tree is stored as flat JSON arrays by train_model.py and walked in pure
+    Python, so scoring one customer costs a few dict lookups and comparisons
+    instead of a DataFrame build and two sklearn ensemble calls.
+    """
+
+    def __init__(self, spec):
+        self.features = spec['features']
+        self.sources = [FEATURE_SOURCES.get(feature, feature) for feature in self.features]
+        self.categories = spec['categories']
+        self.defaults = [spec['defaults'][feature] for feature in self.features]
+        self.left = spec['children_left']
+        self.right = spec['children_right']
+        self.split_feature = spec['feature']
+        self.threshold = spec['threshold']
+        self.value = spec['value']
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as f:
+            return cls(json.load(f))
+
+    def _encode(self, customer_data):
+        x = []
+        for feature, source, default in zip(self.features, self.sources, self.defaults):
+            raw = customer_data.get(source)
+            categories = self.categories.get(feature)
+            if categories is not None:
+                x.append(categories.get(str(raw).strip(), default))
+            else:
+                try:
+                    x.append(float(raw))
+                except (TypeError, ValueError):
+                    x.append(default)
+        return x
+
+    def predict_proba_one(self, customer_data):
+        x = self._encode(customer_data)
+        left, right, split_feature, threshold = self.left, self.right, self.split_feature, self.threshold
+        node = 0
+        while left[node] != -1:
+            node = left[node] if x[split_feature[node]] <= threshold[node] else right[node]
+        return self.value[node]
+
+    def predict(self, customer_data):
+        probability = min(max(self.predict_proba_one(customer_data), 0.0), 1.0)
+        return int(probability > 0.5), float(probability)
+
+    def explain(self, customer_data):
+        """
+        Score one customer and attribute the probability along its decision path;
+        fields the customer does not carry are left out, as in ModelVersion.explain_frame
+
+        Returns:
+            tuple: (prediction, probability, base probability, {feature: contribution})
+        """
+        x = self._encode(customer_data)
+        contributions = dict.fromkeys(self.sources, 0.0)
+        node = 0
+        while self.left[node] != -1:
+            feature = self.split_feature[node]
+            child = self.left[node] if x[feature] <= self.threshold[node] else self.right[node]
+            contributions[self.sources[feature]] += self.value[child] - self.value[node]
+            node = child
+        probability = self.value[node]
+        contributions = {source: value for source, value in contributions.items() if source in customer_data}
+        return int(probability > 0.5), float(probability), float(self.value[0]), contributions
+
+
+class RuleBasedModel:
+    """Adapter giving the rule-based ChurnPredictor the registry model interface"""
+
+    def __init__(self, predictor):
+        self.version = RULES_VERSION
+        self.predictor = predictor
+        self.manifest = {'version': RULES_VERSION, 'type': 'rules'}
+        self.interactive_tier = 'rules'
+        # The rules only read CUSTOMER_COLUMNS
+        self.optional_columns = []
+
+    def predict(self, customer_data):
+        return self.predictor.predict(customer_data)
+
+    def predict_interactive(self, customer_data):
+        return self.predictor.predict(customer_data)
+
+    def explain_frame(self, df):
+        """
+        Score a frame and return its exact additive factor contributions
+
+        Returns:
+            tuple: (predictions, probabilities, base probability, factor names, contributions)
+        """
+        probs, base, factors, contributions = self.predictor.explain_frame(df)
+        return (probs > 0.5).astype(np.int8), probs, base, factors, contributions
+
+    def predict_frame(self, df):
+        preds, probs, _, _, _ = self.explain_frame(df)
+        return preds, probs
+
+    def explain_interactive(self, customer_data):
+        preds, probs, base, factors, contributions = self.explain_frame(pd.DataFrame([customer_data]))
+        return int(preds[0]), float(probs[0]), base, dict(zip(factors, contributions[0].tolist()))
+
+
+class ModelVersion:
+    """One trained RF + GB ensemble artifact set, loaded from its version directory"""
+
+    def __init__(self, path):
+        self.path = path
+        self.manifest = _load_manifest(path)
+        self.version = self.manifest['version']
+
+        self.rf_model = _load_pickle(os.path.join(path, 'rf_model.pkl'))
+        self.gb_model = _load_pickle(os.path.join(path, 'gb_model.pkl'))
+        self.scaler = _load_pickle(os.path.join(path, 'scaler.pkl'))
+        self.label_encoders = _load_pickle(os.path.join(path, 'label_encoders.pkl'))
+        self.feature_names = _load_pickle(os.path.join(path, 'feature_names.pkl'))
+
+        # Encoded training values used for features an upload does not carry
+        self.feature_defaults = self.manifest.get('feature_defaults', {})
+
+        # Optional distilled tier for single-customer requests
+        compact_path = os.path.join(path, COMPACT_FILE)
+        self.compact = CompactModel.load(compact_path) if os.path.isfile(compact_path) else None
+        self.interactive_tier = 'compact' if self.compact else 'ensemble'
+
+        # Path contribution tables, built on the first explained request
+        self._attribution = None
+        self.factor_names = [FEATURE_SOURCES.get(feature, feature) for feature in self.feature_names]
+
+        # Upload columns beyond CUSTOMER_COLUMNS that this version was trained on
+        self.optional_columns = [name for name in self.factor_names if name in OPTIONAL_COLUMNS]
+
+    def build_features(self, df):
+        """
+        Encode a validated customer frame into the training feature matrix
+
+        Categoricals are encoded through the saved LabelEncoders' classes in one
+        vectorized pass; unknown values and features absent from the upload use
+        the training default recorded in the manifest.
+        """
+        n = len(df)
+        matrix = np.empty((n, len(self.feature_names)), dtype=float)
+
+        for j, feature in enumerate(self.feature_names):
+            source = FEATURE_SOURCES.get(feature, feature)
+            default = self.feature_defaults.get(feature, 0)
+
+            if source not in df.columns:
+                matrix[:, j] = default
+            elif feature in self.label_encoders:
+                classes = self.label_encoders[feature].classes_
+                codes = pd.Categorical(df[source].astype(str), categories=classes).codes.astype(float)
+                codes[codes < 0] = default
+                matrix[:, j] = codes
+            else:
+                matrix[:, j] = pd.to_numeric(df[source], errors='coerce').fillna(default).to_numpy()
+
+        return self.scaler.transform(matrix)
+
+    def predict_frame(self, df):
+        """
+        Score a whole frame at once with the RF + GB ensemble
+
+        Returns:
+            tuple: (predictions int8 array, churn probabilities float array)
+        """
+        X = self.build_features(df)
+        probs = (self.rf_model.predict_proba(X)[:, 1] + self.gb_model.predict_proba(X)[:, 1]) / 2
+        return (probs > 0.5).astype(np.int8), probs
+
+    def explain_frame(self, df):
+        """
+        Score a frame with the ensemble and attribute each probability to the features
+
+        Features the frame does not carry are scored at their training default and
+        left out of the factors: a constant the customer never supplied is not a
+        reason for their score.
+
+        Returns:
+            tuple: (predictions, probabilities, base probability, factor names, contributions)
+        """
+        if self._attribution is None:
+            self._attribution = TreeAttribution(self.rf_model, self.gb_model, len(self.feature_names))
+        probs, base, contributions = self._attribution.explain(self.build_features(df))
+        supplied = [j for j, name in enumerate(self.factor_names) if name in df.columns]
+        factors = [self.factor_names[j] for j in supplied]
+        return (probs > 0.5).astype(np.int8), probs, base, factors, contributions[:, supplied]
+
+    def predict(self, customer_data):
+        preds, probs = self.predict_frame(pd.DataFrame([customer_data]))
+        return int(preds[0]), float(probs[0])
+
+    def predict_interactive(self, customer_data):
+        """Single-customer scoring: the compact tier when distilled, the full ensemble otherwise"""
+        if self.compact is not None:
+            return self.compact.predict(customer_data)
+        return self.predict(customer_data)
+
+    def explain_interactive(self, customer_data):
+        """predict_interactive plus (base probability, {feature: contribution}) from the same tier"""
+        if self.compact is not None:
+            return self.compact.explain(customer_data)
+        preds, probs, base, factors, contributions = self.explain_frame(pd.DataFrame([customer_data]))
+        return int(preds[0]), float(probs[0]), base, dict(zip(factors, contributions[0].tolist()))
+
+    def validate(self):
+        """Warm the models and sanity-check their output; raises ValueError when unusable"""
+        preds, probs = self.predict_frame(pd.DataFrame(WARMUP_CUSTOMERS))
+        if len(probs) != len(WARMUP_CUSTOMERS) or not np.all(np.isfinite(probs)):
+            raise ValueError(f'Model {self.version} returned invalid probabilities')
+        if np.any((probs < 0) | (probs > 1)):
+            raise ValueError(f'Model {self.version} returned probabilities outside [0, 1]')
+        for customer in WARMUP_CUSTOMERS:
+            self.predict_interactive(customer)
+
+
+class ModelRegistry:
+    """
+    Holds the active model and swaps in new versions under live traffic
+
+    Readers take `registry.current` once per request and use that object
+    throughout, so a swap (a single reference assignment) never mixes versions
+    within a request.
+    """
+
+    def __init__(self, root=REGISTRY_DIR, fallback=None):
+        self.root = root
+        self.fallback = fallback
+        self.current = fallback
+        self._lock = threading.Lock()
+        self._watcher = None
+        self._failed_versions = set()
+
+    def available_versions(self):
+        """Version directories that carry a manifest, oldest first"""
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(
+            name for name in os.listdir(self.root)
+            if os.path.isfile(os.path.join(self.root, name, MANIFEST_FILE))
+        )
+
+    def latest_version(self):
+        """Version named by the LATEST pointer written by train_model.py"""
+        try:
+            with open(os.path.join(self.root, LATEST_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def load(self, version):
+        """Load and validate a version without activating it"""
+        if version not in self.available_versions():
+            raise ValueError(f'Unknown model version: {version}')
+        model = ModelVersion(os.path.join(self.root, version))
+        model.validate()
+        return model
+
+    def activate(self, version):
+        """Load, validate and warm `version`, then atomically make it current"""
+        with self._lock:
+            if self.current is not None and self.current.version == version:
+                return self.current
+            model = self.load(version)
+            self.current = model
+            print(f"✅ Model version {version} activated")
+            return model
+
+    def reload_latest(self):
+        """Activate the LATEST version if it differs from the current one"""
+        version = self.latest_version()
+        if version is None or version in self._failed_versions:
+            return self.current
+        if self.current is not None and self.current.version == version:
+            return self.current
+        try:
+            return self.activate(version)
+        except Exception:
+            # Don't retry a broken artifact set on every poll
+            self._failed_versions.add(version)
+            raise
+
+    def start_watcher(self, interval):
+        """Poll the LATEST pointer in a daemon thread and hot-swap new versions"""
+        if self._watcher is not None or interval <= 0:
+            return
+
+        def watch():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.reload_latest()
+                except Exception as e:
+                    print(f"⚠️ Model reload failed, keeping {getattr(self.current, 'version', None)}: {e}")
+
+        self._watcher = threading.Thread(target=watch, name='model-registry-watcher', daemon=True)
+        self._watcher.start()
+
+    def status(self):
+        return {
+            'active_version': self.current.version if self.current else None,
+            'latest_version': self.latest_version(),
+            'available_versions': self.available_versions(),
+            'manifest': self.current.manifest if self.current else None
+        }
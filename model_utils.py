@@ -2,6 +2,14 @@ import pandas as pd
 import numpy as np
 
 
+# Starting risk score before any factor is applied
+BASE_RISK_SCORE = 0.30
+
+# Additive factors of the rule-based score, in the order predict() applies them
+RULE_FACTORS = ['Contract', 'tenure', 'MonthlyCharges', 'SeniorCitizen',
+                'InternetService', 'Partner', 'Dependents', 'PaymentMethod']
+
+
 class ChurnPredictor:
     """Customer Churn Predictor using rule-based algorithm"""
     
@@ -23,7 +31,7 @@ class ChurnPredictor:
         """
         try:
             # Initialize base risk score (30%)
-            risk_score = 0.30
+            risk_score = BASE_RISK_SCORE
             
             # FACTOR 1: CONTRACT TYPE (Biggest Impact)
             contract = str(customer_data.get('Contract', '')).strip()
@@ -121,4 +129,66 @@ class ChurnPredictor:
             pred, prob = self.predict(customer_data)
             predictions.append(pred)
             probabilities.append(prob)
-        
\ No newline at end of file
+        
+
+    def explain_frame(self, df):
+        """
+        Per-customer factor contributions for a whole frame, vectorized
+
+        Applies the same eight rules as predict() column-wise and returns the
+        same probabilities. The last column, 'Clipping', is the adjustment made
+        by the 5%-95% bound, so base + row sum equals the probability.
+
+        Args:
+            df (DataFrame): Customer frame with the upload columns
+
+        Returns:
+            tuple: (probabilities, base score, factor names, contributions array of shape (n, 9))
+        """
+        n = len(df)
+
+        def text(column, default=''):
+            if column not in df.columns:
+                return pd.Series([default.lower()] * n, index=df.index)
+            return df[column].astype(str).str.strip().str.lower()
+
+        def number(column, default):
+            if column not in df.columns:
+                return np.full(n, float(default))
+            return pd.to_numeric(df[column], errors='coerce').fillna(default).to_numpy(dtype=float)
+
+        contract = text('Contract')
+        tenure = np.trunc(number('tenure', 12))
+        monthly_charges = number('MonthlyCharges', 50)
+        senior = np.trunc(number('SeniorCitizen', 0))
+        internet = text('InternetService')
+        payment = text('PaymentMethod')
+
+        factors = np.column_stack([
+            np.select(
+                [contract.str.contains('month', regex=False),
+                 contract.str.contains('two', regex=False),
+                 contract.str.contains('one', regex=False)],
+                [0.25, -0.20, 0.05], 0.0),
+            np.select([tenure < 6, tenure < 12, tenure > 48, tenure > 24], [0.20, 0.10, -0.15, -0.10], 0.0),
+            np.select([monthly_charges > 90, monthly_charges > 70, monthly_charges < 30], [0.12, 0.05, -0.08], 0.0),
+            np.where(senior == 1, 0.08, 0.0),
+            np.select(
+                [internet.str.contains('fiber', regex=False), internet.str.contains('no', regex=False)],
+                [0.05, -0.10], 0.0),
+            np.where(text('Partner', 'No').str.contains('yes', regex=False), -0.08, 0.0),
+            np.where(text('Dependents', 'No').str.contains('yes', regex=False), -0.08, 0.0),
+            np.select(
+                [payment.str.contains('electronic', regex=False), payment.str.contains('auto', regex=False)],
+                [0.10, -0.05], 0.0),
+        ])
+
+        # Accumulate from the base in predict()'s order so float rounding, and
+        # therefore the 0.5 cut, matches it exactly
+        risk_score = np.full(n, BASE_RISK_SCORE)
+        for contribution in factors.T:
+            risk_score = risk_score + contribution
+        probabilities = np.clip(risk_score, 0.05, 0.95)
+
+        contributions = np.column_stack([factors, probabilities - risk_score])
+        return probabilities, BASE_RISK_SCORE, RULE_FACTORS + ['Clipping'], contributions
@@ -0,0 +1,44 @@
+"""Uploads keep the service columns a trained model asks for"""
+
+import io
+
+import pandas as pd
+
+from data_utils import CUSTOMER_COLUMNS, ValidationReport, iter_customer_chunks, validate_customer_frame
+
+
+CSV = (
+    b"gender,SeniorCitizen,Partner,Dependents,tenure,Contract,PaymentMethod,MonthlyCharges,TotalCharges,"
+    b"InternetService,Tech Support,paperless_billing,StreamingTV\n"
+    b"Male,0,No,No,2,Month-to-month,Electronic check,95.0,190.0,Fiber optic,no,Yes,maybe\n"
+    b"Female,1,Yes,No,40,Two year,Mailed check,20.0,800.0,No,No internet service,No,No internet service\n"
+)
+
+
+def read(optional_columns, policy='default'):
+    report = ValidationReport(policy)
+    chunks = iter_customer_chunks(io.BytesIO(CSV), 'customers.csv', optional_columns=optional_columns)
+    frames = [validate_customer_frame(chunk, report, return_imputed=True) for chunk in chunks]
+    return frames[0][0], frames[0][1], report
+
+
+def test_optional_columns_only_when_requested():
+    df, _, report = read(())
+    assert list(df.columns) == CUSTOMER_COLUMNS
+    assert report.total_errors == 0
+
+
+def test_optional_columns_are_validated():
+    df, imputed, report = read(['TechSupport', 'PaperlessBilling', 'StreamingTV', 'OnlineBackup'])
+    assert list(df.columns) == CUSTOMER_COLUMNS + ['TechSupport', 'StreamingTV', 'PaperlessBilling']
+    assert df['TechSupport'].tolist() == ['No', 'No internet service']
+    assert df['PaperlessBilling'].tolist() == ['Yes', 'No']
+    # Bad cells are left for the model's training default; absent columns are not "missing"
+    assert pd.isna(df['StreamingTV'].iloc[0]) and bool(imputed['StreamingTV'].iloc[0])
+    assert report.error_counts == {'StreamingTV: not an allowed value': 1}
+    assert report.missing_columns == []
+
+
+def test_bad_optional_cell_rejects_upload():
+    _, _, report = read(['StreamingTV'], policy='reject')
+    assert report.rejected
@@ -0,0 +1,78 @@
+"""Vectorized rule scoring must agree with ChurnPredictor.predict row for row"""
+
+import itertools
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from data_utils import ValidationReport, iter_customer_chunks, validate_customer_frame
+from model_registry import RuleBasedModel
+from model_utils import ChurnPredictor
+
+
+DATA_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'customer_data.csv')
+
+
+def rule_grid():
+    """Every combination of the values each rule branches on"""
+    combos = itertools.product(
+        ['Month-to-month', 'One year', 'Two year'],
+        [2, 8, 13, 30, 60],
+        [20.0, 50.0, 75.0, 95.0],
+        [0, 1],
+        ['Fiber optic', 'DSL', 'No'],
+        ['Yes', 'No'],
+        ['Electronic check', 'Mailed check', 'Bank transfer (automatic)'],
+    )
+    return pd.DataFrame([
+        {'Gender': 'Female', 'Contract': contract, 'tenure': tenure, 'MonthlyCharges': charges,
+         'TotalCharges': charges * tenure, 'SeniorCitizen': senior, 'InternetService': internet,
+         'Partner': partner, 'Dependents': partner, 'PaymentMethod': payment}
+        for contract, tenure, charges, senior, internet, partner, payment in combos
+    ])
+
+
+def load_customers():
+    report = ValidationReport('default')
+    with open(DATA_PATH, 'rb') as f:
+        return pd.concat(
+            [validate_customer_frame(chunk, report) for chunk in iter_customer_chunks(f, DATA_PATH)],
+            ignore_index=True
+        )
+
+
+def assert_matches_predict(df):
+    predictor = ChurnPredictor()
+    model = RuleBasedModel(predictor)
+    expected = [predictor.predict(row) for row in df.to_dict('records')]
+    expected_preds = np.array([pred for pred, _ in expected])
+    expected_probs = np.array([prob for _, prob in expected])
+
+    preds, probs = model.predict_frame(df)
+    np.testing.assert_array_equal(preds, expected_preds)
+    np.testing.assert_array_equal(probs, expected_probs)
+
+    preds, probs, base, factors, contributions = model.explain_frame(df)
+    np.testing.assert_array_equal(preds, expected_preds)
+    np.testing.assert_array_equal(probs, expected_probs)
+    np.testing.assert_allclose(base + contributions.sum(axis=1), expected_probs, atol=1e-12)
+    assert factors[-1] == 'Clipping'
+
+
+def test_rule_grid_matches_predict():
+    assert_matches_predict(rule_grid())
+
+
+@pytest.mark.skipif(not os.path.isfile(DATA_PATH), reason='customer_data.csv not available')
+def test_customer_data_matches_predict():
+    assert_matches_predict(load_customers())
+
+
+def test_boundary_case_matches_predict():
+    customer = {'Contract': 'Month-to-month', 'tenure': 13, 'MonthlyCharges': 75.0, 'SeniorCitizen': 0,
+                'InternetService': 'No', 'Partner': 'No', 'Dependents': 'No', 'PaymentMethod': 'Mailed check'}
+    predictor = ChurnPredictor()
+    model = RuleBasedModel(predictor)
+    assert model.explain_interactive(customer)[:2] == predictor.predict(customer)
@@ -1,178 +1,593 @@
+"""
+Customer Churn Model Training
+
+    python train_model.py                               full retrain on customer_data.csv
+    python train_model.py --incremental labels.csv      update the LATEST version with new labels
+    python train_model.py --incremental labels.csv --compare-full
+                                                        ...and report the gap to a full retrain
+    python train_model.py --tune                        successive-halving search, then full retrain
+
+Every run writes a new versioned artifact set into models/registry/ and
+points LATEST at it, which the running app hot-swaps in.
+"""
+
 import pandas as pd
 import numpy as np
-from sklearn.model_selection import train_test_split
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.model_selection import train_test_split, HalvingRandomSearchCV
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.tree import DecisionTreeRegressor
 from sklearn.metrics import accuracy_score, precision_score, recall_score, roc_auc_score
+from datetime import datetime
+from model_registry import CompactModel, WARMUP_CUSTOMERS
+import argparse
 import pickle
+import json
+import time
 import os
 
-print("🚀 Starting Customer Churn Model Training...")
-
-# Create models directory
-if not os.path.exists('models'):
-    os.makedirs('models')
-    print("✅ Created 'models' folder")
-
-# Load dataset
-print("\n📂 Loading dataset...")
-df = pd.read_csv('customer_data.csv')
-print(f"✅ Dataset loaded: {df.shape[0]} rows, {df.shape[1]} columns")
-
-# DATA CLEANING
-print("\n🧹 Cleaning data...")
-df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
-df['TotalCharges'].fillna(df['TotalCharges'].median(), inplace=True)
-
-if 'customerID' in df.columns:
-    df = df.drop('customerID', axis=1)
-
-df['Churn'] = df['Churn'].map({'Yes': 1, 'No': 0})
-print("✅ Data cleaning completed!")
-
-# FEATURE ENGINEERING
-print("\n⚙️ Engineering features...")
-
-# Store categorical columns BEFORE encoding
-categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
-print(f"   Found {len(categorical_cols)} categorical columns: {categorical_cols}")
-
-# Create and save label encoders
-label_encoders = {}
-
-for col in categorical_cols:
-    le = LabelEncoder()
-    df[col] = le.fit_transform(df[col].astype(str))
-    label_encoders[col] = le
-    print(f"   ✓ Encoded {col}: {len(le.classes_)} unique values")
-
-# Save label encoders IMMEDIATELY
-with open('models/label_encoders.pkl', 'wb') as f:
-    pickle.dump(label_encoders, f)
-print(f"\n✅ Saved {len(label_encoders)} label encoders to models/label_encoders.pkl")
-
-# SPLIT DATA
-print("\n📊 Splitting data...")
-X = df.drop('Churn', axis=1)
-y = df['Churn']
-
-X_train, X_test, y_train, y_test = train_test_split(
-    X, y, test_size=0.2, random_state=42, stratify=y
-)
-
-# Save feature names
-feature_names = X.columns.tolist()
-with open('models/feature_names.pkl', 'wb') as f:
-    pickle.dump(feature_names, f)
-print(f"✅ Saved {len(feature_names)} feature names")
-
-# Scale features
-scaler = StandardScaler()
-X_train_scaled = scaler.fit_transform(X_train)
-X_test_scaled = scaler.transform(X_test)
-
-# Save scaler
-with open('models/scaler.pkl', 'wb') as f:
-    pickle.dump(scaler, f)
-print("✅ Saved scaler")
-
-print(f"\n   Training set: {X_train.shape[0]} samples")
-print(f"   Test set: {X_test.shape[0]} samples")
-
-# TRAIN MODELS
-print("\n🤖 Training AI models...")
-
-# Random Forest
-print("\n1️⃣ Training Random Forest...")
-rf_model = RandomForestClassifier(
-    n_estimators=100,
-    max_depth=10,
-    random_state=42,
-    n_jobs=-1
-)
-rf_model.fit(X_train_scaled, y_train)
-rf_pred = rf_model.predict(X_test_scaled)
-rf_accuracy = accuracy_score(y_test, rf_pred)
-print(f"   ✅ Random Forest Accuracy: {rf_accuracy*100:.2f}%")
-
-# Gradient Boosting
-print("\n2️⃣ Training Gradient Boosting...")
-gb_model = GradientBoostingClassifier(
-    n_estimators=100,
-    learning_rate=0.1,
-    max_depth=5,
-    random_state=42
-)
-gb_model.fit(X_train_scaled, y_train)
-gb_pred = gb_model.predict(X_test_scaled)
-gb_accuracy = accuracy_score(y_test, gb_pred)
-print(f"   ✅ Gradient Boosting Accuracy: {gb_accuracy*100:.2f}%")
-
-# ENSEMBLE
-print("\n3️⃣ Creating Ensemble Model...")
-ensemble_pred_proba = (rf_model.predict_proba(X_test_scaled) + 
-                       gb_model.predict_proba(X_test_scaled)) / 2
-ensemble_pred = (ensemble_pred_proba[:, 1] > 0.5).astype(int)
-ensemble_accuracy = accuracy_score(y_test, ensemble_pred)
-
-print(f"   ✅ Ensemble Accuracy: {ensemble_accuracy*100:.2f}%")
-
-# EVALUATE
-print("\n📈 Final Model Performance:")
-precision = precision_score(y_test, ensemble_pred)
-recall = recall_score(y_test, ensemble_pred)
-auc_roc = roc_auc_score(y_test, ensemble_pred_proba[:, 1])
-
-print(f"   📊 Accuracy:  {ensemble_accuracy*100:.2f}%")
-print(f"   🎯 Precision: {precision*100:.2f}%")
-print(f"   🔍 Recall:    {recall*100:.2f}%")
-print(f"   📉 AUC-ROC:   {auc_roc*100:.2f}%")
-
-# SAVE MODELS
-print("\n💾 Saving models...")
-
-# Save individual models
-with open('models/rf_model.pkl', 'wb') as f:
-    pickle.dump(rf_model, f)
-print("   ✓ Saved Random Forest model")
-
-with open('models/gb_model.pkl', 'wb') as f:
-    pickle.dump(gb_model, f)
-print("   ✓ Saved Gradient Boosting model")
-
-# Save ensemble
-ensemble_config = {
-    'rf_model': rf_model,
-    'gb_model': gb_model,
-    'accuracy': ensemble_accuracy,
-    'precision': precision,
-    'recall': recall,
-    'auc_roc': auc_roc
+
+DATA_PATH = 'customer_data.csv'
+REGISTRY_DIR = os.path.join('models', 'registry')
+
+# Encoded (unscaled) features + labels of every labeled row seen so far
+FEATURE_STORE_PATH = os.path.join('models', 'feature_store.npz')
+
+RF_PARAMS = {'n_estimators': 100, 'max_depth': 10, 'random_state': 42, 'n_jobs': -1}
+GB_PARAMS = {'n_estimators': 100, 'learning_rate': 0.1, 'max_depth': 5, 'random_state': 42}
+
+# Incremental mode: trees added to the forest per update, forest size cap
+# (oldest trees are dropped first) and the sliding window the update is fitted
+# on: GB_WINDOW_FACTOR rows per new label, clamped to [GB_MIN_WINDOW_ROWS,
+# GB_MAX_WINDOW_ROWS] so an update stays well below a full refit's cost
+INCREMENTAL_RF_TREES = 20
+MAX_RF_TREES = 300
+GB_WINDOW_FACTOR = 4
+GB_MIN_WINDOW_ROWS = 1000
+GB_MAX_WINDOW_ROWS = 2500
+
+# Tuning: search spaces, candidates sampled for successive halving, and the
+# AUC tolerance within which the cheapest-to-serve candidate wins
+RF_SEARCH_SPACE = {
+    'n_estimators': [50, 100, 200, 300],
+    'max_depth': [4, 6, 8, 10, 12, None],
+    'min_samples_leaf': [1, 2, 5, 10],
+    'max_features': ['sqrt', 'log2', 0.5],
+}
+GB_SEARCH_SPACE = {
+    'n_estimators': [50, 100, 200],
+    'learning_rate': [0.03, 0.05, 0.1, 0.2],
+    'max_depth': [2, 3, 4, 5],
+    'subsample': [0.7, 0.85, 1.0],
+    'min_samples_leaf': [1, 5, 20],
 }
+TUNE_CANDIDATES = 48
+TUNE_AUC_TOLERANCE = 0.005
+
+# Distilled interactive tier: a shallow tree over the fields the dashboard sends,
+# fitted to the ensemble's probabilities
+COMPACT_FEATURES = ['gender', 'SeniorCitizen', 'Partner', 'Dependents', 'tenure', 'Contract',
+                    'PaymentMethod', 'MonthlyCharges', 'TotalCharges', 'InternetService']
+COMPACT_MAX_DEPTH = 6
+COMPACT_MIN_SAMPLES_LEAF = 20
+
+
+# ===========================
+# DATA
+# ===========================
 
-with open('models/ensemble_model.pkl', 'wb') as f:
-    pickle.dump(ensemble_config, f)
-print("   ✓ Saved Ensemble model")
-
-# FEATURE IMPORTANCE
-print("\n🔑 Top 10 Important Features:")
-feature_importance = pd.DataFrame({
-    'feature': feature_names,
-    'importance': rf_model.feature_importances_
-}).sort_values('importance', ascending=False)
-
-for idx, row in feature_importance.head(10).iterrows():
-    print(f"   {row['feature']}: {row['importance']:.4f}")
-
-print("\n" + "="*60)
-print("🎉 MODEL TRAINING COMPLETED SUCCESSFULLY!")
-print("="*60)
-print("\n📁 Saved files in 'models/' folder:")
-print("   ✅ ensemble_model.pkl")
-print("   ✅ rf_model.pkl")
-print("   ✅ gb_model.pkl")
-print("   ✅ scaler.pkl")
-print("   ✅ label_encoders.pkl")
-print("   ✅ feature_names.pkl")
-print("\n✅ Ready to make predictions!")
-print("="*60)
\ No newline at end of file
+def load_dataset(path):
+    """Load a labeled customer CSV and apply the training cleaning rules"""
+    print(f"\n📂 Loading dataset: {path}")
+    df = pd.read_csv(path)
+    print(f"✅ Dataset loaded: {df.shape[0]} rows, {df.shape[1]} columns")
+
+    print("\n🧹 Cleaning data...")
+    df['TotalCharges'] = pd.to_numeric(df['TotalCharges'], errors='coerce')
+    df['TotalCharges'] = df['TotalCharges'].fillna(df['TotalCharges'].median())
+
+    if 'customerID' in df.columns:
+        df = df.drop('customerID', axis=1)
+
+    df['Churn'] = df['Churn'].map({'Yes': 1, 'No': 0})
+    print("✅ Data cleaning completed!")
+    return df
+
+
+def fit_label_encoders(df):
+    """Fit a LabelEncoder per categorical column and encode df in place"""
+    categorical_cols = df.select_dtypes(include=['object']).columns.tolist()
+    print(f"   Found {len(categorical_cols)} categorical columns: {categorical_cols}")
+
+    label_encoders = {}
+    for col in categorical_cols:
+        le = LabelEncoder()
+        df[col] = le.fit_transform(df[col].astype(str))
+        label_encoders[col] = le
+        print(f"   ✓ Encoded {col}: {len(le.classes_)} unique values")
+
+    return label_encoders
+
+
+def encode_with(df, label_encoders, feature_names, feature_defaults):
+    """Encode new rows with existing encoders; unseen values and missing columns use training defaults"""
+    X = pd.DataFrame(index=df.index)
+    for col in feature_names:
+        default = feature_defaults[col]
+        if col not in df.columns:
+            X[col] = default
+        elif col in label_encoders:
+            codes = pd.Categorical(df[col].astype(str), categories=label_encoders[col].classes_).codes
+            X[col] = np.where(codes < 0, default, codes)
+        else:
+            X[col] = pd.to_numeric(df[col], errors='coerce').fillna(default)
+    return X
+
+
+def compute_feature_defaults(X_train, label_encoders):
+    """Encoded training defaults for features an upload does not carry"""
+    return {
+        col: int(X_train[col].mode()[0]) if col in label_encoders else float(X_train[col].median())
+        for col in X_train.columns
+    }
+
+
+def save_feature_store(X, y, is_test):
+    np.savez_compressed(
+        FEATURE_STORE_PATH,
+        X=np.asarray(X, dtype=np.float32),
+        y=np.asarray(y, dtype=np.int8),
+        is_test=np.asarray(is_test, dtype=bool)
+    )
+    print(f"✅ Saved feature store: {len(y)} rows ({int(np.sum(is_test))} held out)")
+
+
+def load_feature_store():
+    with np.load(FEATURE_STORE_PATH) as store:
+        return store['X'], store['y'], store['is_test']
+
+
+# ===========================
+# MODELS
+# ===========================
+
+def ensemble_proba(rf_model, gb_model, X):
+    return (rf_model.predict_proba(X)[:, 1] + gb_model.predict_proba(X)[:, 1]) / 2
+
+
+def evaluate(rf_model, gb_model, X_test_scaled, y_test):
+    """Ensemble accuracy / precision / recall / AUC on a held-out set"""
+    proba = ensemble_proba(rf_model, gb_model, X_test_scaled)
+    pred = (proba > 0.5).astype(int)
+    return {
+        'accuracy': float(accuracy_score(y_test, pred)),
+        'precision': float(precision_score(y_test, pred, zero_division=0)),
+        'recall': float(recall_score(y_test, pred, zero_division=0)),
+        'auc_roc': float(roc_auc_score(y_test, proba))
+    }
+
+
+def print_metrics(metrics):
+    print(f"   📊 Accuracy:  {metrics['accuracy']*100:.2f}%")
+    print(f"   🎯 Precision: {metrics['precision']*100:.2f}%")
+    print(f"   🔍 Recall:    {metrics['recall']*100:.2f}%")
+    print(f"   📉 AUC-ROC:   {metrics['auc_roc']*100:.2f}%")
+
+
+def save_version(rf_model, gb_model, scaler, label_encoders, feature_names, manifest, extra_files=None):
+    """Write a versioned artifact set (plus optional JSON reports) into the registry and point LATEST at it"""
+    version = datetime.utcnow().strftime('v%Y%m%d-%H%M%S')
+    version_dir = os.path.join(REGISTRY_DIR, version)
+    os.makedirs(version_dir, exist_ok=True)
+
+    print(f"\n💾 Saving models to {version_dir}/ ...")
+    artifacts = {
+        'rf_model.pkl': rf_model,
+        'gb_model.pkl': gb_model,
+        'scaler.pkl': scaler,
+        'label_encoders.pkl': label_encoders,
+        'feature_names.pkl': feature_names,
+        'ensemble_model.pkl': {'rf_model': rf_model, 'gb_model': gb_model, **manifest['metrics']}
+    }
+    for filename, obj in artifacts.items():
+        with open(os.path.join(version_dir, filename), 'wb') as f:
+            pickle.dump(obj, f)
+        print(f"   ✓ Saved {filename}")
+
+    manifest = {
+        'version': version,
+        'type': 'ensemble',
+        'created_at': datetime.utcnow().strftime('%Y-%m-%d %H:%M:%S'),
+        'feature_names': feature_names,
+        **manifest
+    }
+    with open(os.path.join(version_dir, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+    print("   ✓ Saved manifest.json")
+
+    for filename, report in (extra_files or {}).items():
+        with open(os.path.join(version_dir, filename), 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"   ✓ Saved {filename}")
+
+    # Point LATEST at the new version last, atomically, so a running app never
+    # picks up a half-written artifact set
+    latest_tmp = os.path.join(REGISTRY_DIR, 'LATEST.tmp')
+    with open(latest_tmp, 'w') as f:
+        f.write(version)
+    os.replace(latest_tmp, os.path.join(REGISTRY_DIR, 'LATEST'))
+    print(f"   ✓ Registered {version} as LATEST")
+
+    return version
+
+
+def load_version(version):
+    """Load the artifacts and manifest of a registered version"""
+    version_dir = os.path.join(REGISTRY_DIR, version)
+    artifacts = {}
+    for name in ['rf_model', 'gb_model', 'scaler', 'label_encoders', 'feature_names']:
+        with open(os.path.join(version_dir, f'{name}.pkl'), 'rb') as f:
+            artifacts[name] = pickle.load(f)
+    with open(os.path.join(version_dir, 'manifest.json')) as f:
+        artifacts['manifest'] = json.load(f)
+    return artifacts
+
+
+def fit_full(X_train_scaled, y_train, rf_params=RF_PARAMS, gb_params=GB_PARAMS):
+    """Fit the Random Forest and Gradient Boosting models from scratch"""
+    print("\n1️⃣ Training Random Forest...")
+    rf_model = RandomForestClassifier(**rf_params)
+    rf_model.fit(X_train_scaled, y_train)
+
+    print("\n2️⃣ Training Gradient Boosting...")
+    gb_model = GradientBoostingClassifier(**gb_params)
+    gb_model.fit(X_train_scaled, y_train)
+
+    return rf_model, gb_model
+
+
+def _inference_cost(params):
+    """Relative per-row scoring cost: trees visited times nodes walked per tree"""
+    return params['n_estimators'] * (params['max_depth'] or 20)
+
+
+def _search(name, estimator, space, X_train_scaled, y_train):
+    """
+    Successive halving over `space`, then the cheapest candidate within tolerance
+
+    All candidates are fitted on the same pre-scaled matrix, so the scaling is
+    done once rather than once per candidate and fold.
+    """
+    search = HalvingRandomSearchCV(
+        estimator, space,
+        n_candidates=TUNE_CANDIDATES, factor=3, min_resources='exhaust', cv=3, scoring='roc_auc',
+        random_state=42, n_jobs=-1, refit=False
+    )
+    started = time.perf_counter()
+    search.fit(X_train_scaled, y_train)
+    seconds = time.perf_counter() - started
+
+    # Only candidates that survived to the last round saw the full budget
+    results = pd.DataFrame(search.cv_results_)
+    final = results[results['iter'] == results['iter'].max()]
+    best_auc = final['mean_test_score'].max()
+    eligible = final[final['mean_test_score'] >= best_auc - TUNE_AUC_TOLERANCE]
+    chosen = min(eligible.itertuples(), key=lambda row: _inference_cost(row.params))
+
+    # cv_results_ has one row per candidate per round; each row is cv folds of fits
+    fits = len(results) * search.n_splits_
+    print(f"   ✅ {name}: {len(results)} candidate evaluations ({fits} fits) in {seconds:.1f}s, "
+          f"CV AUC {chosen.mean_test_score*100:.2f}% (best {best_auc*100:.2f}%)")
+    print(f"      {chosen.params}")
+
+    return chosen.params, {
+        'search_seconds': round(seconds, 2),
+        'candidates': int(TUNE_CANDIDATES),
+        'candidate_evaluations': int(len(results)),
+        'fits': int(fits),
+        'best_cv_auc': float(best_auc),
+        'chosen_cv_auc': float(chosen.mean_test_score),
+        'params': chosen.params
+    }
+
+
+def tune_models(X_train_scaled, y_train):
+    """Search RF and GB hyperparameters with successive halving across all cores"""
+    print("\n🎛️ Tuning hyperparameters (successive halving)...")
+    rf_tuned, rf_report = _search(
+        'Random Forest', RandomForestClassifier(random_state=42, n_jobs=1),
+        RF_SEARCH_SPACE, X_train_scaled, y_train
+    )
+    gb_tuned, gb_report = _search(
+        'Gradient Boosting', GradientBoostingClassifier(random_state=42),
+        GB_SEARCH_SPACE, X_train_scaled, y_train
+    )
+    rf_params = {**RF_PARAMS, **rf_tuned}
+    gb_params = {**GB_PARAMS, **gb_tuned}
+    return rf_params, gb_params, {'random_forest': rf_report, 'gradient_boosting': gb_report}
+
+
+def time_inference(rf_model, gb_model, X, rows=1000):
+    """Milliseconds to score `rows` rows with the ensemble"""
+    sample = X[:rows]
+    started = time.perf_counter()
+    ensemble_proba(rf_model, gb_model, sample)
+    return (time.perf_counter() - started) * 1000 * rows / len(sample)
+
+
+def distill(rf_model, gb_model, scaler, X_train, X_test, y_test, feature_names, label_encoders, feature_defaults):
+    """
+    Distill the ensemble into a shallow regression tree over COMPACT_FEATURES
+
+    The tree is fitted to the ensemble's probabilities on the (unscaled, encoded)
+    training rows and exported as flat arrays for model_registry.CompactModel.
+
+    Returns:
+        tuple: (JSON-serializable tree spec, report with the accuracy gap on the holdout)
+    """
+    print("\n🧪 Distilling compact model...")
+    teacher_train = ensemble_proba(rf_model, gb_model, scaler.transform(X_train))
+    teacher_test = ensemble_proba(rf_model, gb_model, scaler.transform(X_test))
+
+    columns = [feature_names.index(feature) for feature in COMPACT_FEATURES if feature in feature_names]
+    features = [feature_names[i] for i in columns]
+
+    tree = DecisionTreeRegressor(
+        max_depth=COMPACT_MAX_DEPTH, min_samples_leaf=COMPACT_MIN_SAMPLES_LEAF, random_state=42
+    )
+    tree.fit(X_train[:, columns], teacher_train)
+    student_test = tree.predict(X_test[:, columns])
+
+    spec = {
+        'type': 'decision_tree',
+        'features': features,
+        'categories': {
+            feature: {str(value): code for code, value in enumerate(label_encoders[feature].classes_)}
+            for feature in features if feature in label_encoders
+        },
+        'defaults': {feature: feature_defaults[feature] for feature in features},
+        'children_left': tree.tree_.children_left.tolist(),
+        'children_right': tree.tree_.children_right.tolist(),
+        'feature': tree.tree_.feature.tolist(),
+        'threshold': tree.tree_.threshold.tolist(),
+        'value': tree.tree_.value[:, 0, 0].tolist()
+    }
+
+    compact = CompactModel(spec)
+    calls = 2000
+    started = time.perf_counter()
+    for i in range(calls):
+        compact.predict(WARMUP_CUSTOMERS[i % len(WARMUP_CUSTOMERS)])
+    latency_us = (time.perf_counter() - started) / calls * 1e6
+
+    report = {
+        'features': features,
+        'max_depth': COMPACT_MAX_DEPTH,
+        'leaves': int(tree.get_n_leaves()),
+        'auc_roc': float(roc_auc_score(y_test, student_test)),
+        'ensemble_auc_roc': float(roc_auc_score(y_test, teacher_test)),
+        'accuracy': float(accuracy_score(y_test, student_test > 0.5)),
+        'ensemble_accuracy': float(accuracy_score(y_test, teacher_test > 0.5)),
+        'fidelity_mae': float(np.mean(np.abs(student_test - teacher_test))),
+        'agreement': float(np.mean((student_test > 0.5) == (teacher_test > 0.5))),
+        'latency_us': round(latency_us, 2)
+    }
+    report['auc_gap'] = report['ensemble_auc_roc'] - report['auc_roc']
+
+    print(f"   ✅ {report['leaves']} leaves, AUC {report['auc_roc']*100:.2f}% "
+          f"vs ensemble {report['ensemble_auc_roc']*100:.2f}% (gap {report['auc_gap']*100:+.2f} pts)")
+    print(f"   ✅ Agreement {report['agreement']*100:.1f}%, {report['latency_us']:.1f} µs per prediction")
+
+    return spec, report
+
+
+# ===========================
+# TRAINING MODES
+# ===========================
+
+def train_full(data_path=DATA_PATH, tune=False):
+    """Refit everything from scratch and reset the feature store, optionally tuning first"""
+    df = load_dataset(data_path)
+
+    print("\n⚙️ Engineering features...")
+    label_encoders = fit_label_encoders(df)
+
+    print("\n📊 Splitting data...")
+    X = df.drop('Churn', axis=1)
+    y = df['Churn']
+    feature_names = X.columns.tolist()
+
+    X_train, X_test, y_train, y_test = train_test_split(
+        X, y, test_size=0.2, random_state=42, stratify=y
+    )
+    print(f"   Training set: {X_train.shape[0]} samples")
+    print(f"   Test set: {X_test.shape[0]} samples")
+
+    is_test = X.index.isin(X_test.index)
+    save_feature_store(X, y, is_test)
+
+    # Fit on plain arrays: serving and the feature store pass arrays too
+    scaler = StandardScaler()
+    X_train_scaled = scaler.fit_transform(X_train.to_numpy(dtype=float))
+    X_test_scaled = scaler.transform(X_test.to_numpy(dtype=float))
+
+    rf_params, gb_params, tuning = RF_PARAMS, GB_PARAMS, None
+    if tune:
+        rf_params, gb_params, tuning = tune_models(X_train_scaled, y_train)
+
+    print("\n🤖 Training AI models...")
+    started = time.perf_counter()
+    rf_model, gb_model = fit_full(X_train_scaled, y_train, rf_params, gb_params)
+    fit_seconds = time.perf_counter() - started
+
+    print("\n📈 Final Model Performance:")
+    metrics = evaluate(rf_model, gb_model, X_test_scaled, y_test)
+    print_metrics(metrics)
+    inference_ms = time_inference(rf_model, gb_model, X_test_scaled)
+    print(f"   ⏱️ Inference: {inference_ms:.1f} ms per 1k rows")
+
+    feature_defaults = compute_feature_defaults(X_train, label_encoders)
+    compact_spec, compact_report = distill(
+        rf_model, gb_model, scaler, X_train.to_numpy(dtype=float), X_test.to_numpy(dtype=float),
+        y_test, feature_names, label_encoders, feature_defaults
+    )
+    extra_files = {'compact_model.json': compact_spec}
+
+    if tuning is not None:
+        extra_files['tuning.json'] = tuning
+        tuning.update({
+            'fit_seconds': round(fit_seconds, 2),
+            'inference_ms_per_1k': round(inference_ms, 2),
+            'holdout_auc': metrics['auc_roc']
+        })
+
+    version = save_version(rf_model, gb_model, scaler, label_encoders, feature_names, {
+        'training': 'full',
+        'training_rows': int(len(X_train)),
+        'metrics': metrics,
+        'inference_ms_per_1k': round(inference_ms, 2),
+        'rf_params': rf_params,
+        'gb_params': gb_params,
+        'tuned': tuning is not None,
+        'compact': compact_report,
+        'feature_defaults': feature_defaults
+    }, extra_files=extra_files)
+
+    print("\n🔑 Top 10 Important Features:")
+    feature_importance = pd.DataFrame({
+        'feature': feature_names,
+        'importance': rf_model.feature_importances_
+    }).sort_values('importance', ascending=False)
+
+    for idx, row in feature_importance.head(10).iterrows():
+        print(f"   {row['feature']}: {row['importance']:.4f}")
+
+    return version
+
+
+def train_incremental(labels_path, compare_full=False):
+    """
+    Update the LATEST version with newly labeled customers without a full refit
+
+    New rows are encoded with the base version's encoders and appended to the
+    feature store. The forest grows by INCREMENTAL_RF_TREES trees fitted on a
+    sliding window of the most recent training rows, sized from the number of
+    new labels (warm_start), capped at MAX_RF_TREES by dropping the oldest
+    trees; GB is refit on the same window. The base scaler is kept so existing
+    trees stay valid.
+    """
+    with open(os.path.join(REGISTRY_DIR, 'LATEST')) as f:
+        base_version = f.read().strip()
+    print(f"\n📦 Base version: {base_version}")
+    base = load_version(base_version)
+    feature_names = base['feature_names']
+    scaler = base['scaler']
+    # The parent's (possibly tuned) hyperparameters, for the update and the comparison alike
+    rf_params = {**RF_PARAMS, **base['manifest'].get('rf_params', {})}
+    gb_params = {**GB_PARAMS, **base['manifest'].get('gb_params', {})}
+
+    df = load_dataset(labels_path)
+    df = df[df['Churn'].notna()]
+    X_new = encode_with(df, base['label_encoders'], feature_names, base['manifest']['feature_defaults'])
+    y_new = df['Churn'].astype(int).to_numpy()
+
+    X_store, y_store, is_test = load_feature_store()
+    X_store = np.vstack([X_store, X_new.to_numpy(dtype=np.float32)])
+    y_store = np.concatenate([y_store, y_new])
+    is_test = np.concatenate([is_test, np.zeros(len(y_new), dtype=bool)])
+    save_feature_store(X_store, y_store, is_test)
+
+    train_rows = np.flatnonzero(~is_test)
+    window_rows = min(max(GB_WINDOW_FACTOR * len(y_new), GB_MIN_WINDOW_ROWS), GB_MAX_WINDOW_ROWS)
+    window = train_rows[-window_rows:]
+    X_window_scaled = scaler.transform(X_store[window])
+    y_window = y_store[window]
+    X_test_scaled = scaler.transform(X_store[is_test])
+    y_test = y_store[is_test]
+    if len(np.unique(y_window)) < 2:
+        raise ValueError('Sliding window must contain both churned and retained customers')
+
+    print(f"\n🤖 Updating models on a {len(window)}-row window ({len(y_new)} new labels)...")
+    started = time.perf_counter()
+
+    rf_model = base['rf_model']
+    rf_model.set_params(warm_start=True, n_estimators=len(rf_model.estimators_) + INCREMENTAL_RF_TREES)
+    rf_model.fit(X_window_scaled, y_window)
+    if len(rf_model.estimators_) > MAX_RF_TREES:
+        rf_model.estimators_ = rf_model.estimators_[-MAX_RF_TREES:]
+    rf_model.set_params(warm_start=False, n_estimators=len(rf_model.estimators_))
+
+    gb_model = GradientBoostingClassifier(**gb_params)
+    gb_model.fit(X_window_scaled, y_window)
+
+    incremental_seconds = time.perf_counter() - started
+    print(f"   ✅ Updated in {incremental_seconds:.1f}s ({len(rf_model.estimators_)} trees in forest)")
+
+    print("\n📈 Incremental Model Performance:")
+    metrics = evaluate(rf_model, gb_model, X_test_scaled, y_test)
+    print_metrics(metrics)
+
+    comparison = {'base_metrics': base['manifest']['metrics'], 'incremental_seconds': round(incremental_seconds, 2)}
+
+    feature_defaults = base['manifest']['feature_defaults']
+    compact_spec, compact_report = distill(
+        rf_model, gb_model, scaler, X_store[train_rows], X_store[is_test],
+        y_test, feature_names, base['label_encoders'], feature_defaults
+    )
+
+    if compare_full:
+        print("\n⚖️ Comparing with a full retrain on all stored rows...")
+        started = time.perf_counter()
+        full_rf, full_gb = fit_full(scaler.transform(X_store[train_rows]), y_store[train_rows], rf_params, gb_params)
+        comparison['full_seconds'] = round(time.perf_counter() - started, 2)
+        comparison['full_metrics'] = evaluate(full_rf, full_gb, X_test_scaled, y_test)
+        comparison['auc_gap'] = comparison['full_metrics']['auc_roc'] - metrics['auc_roc']
+        print(f"   Full retrain:  AUC {comparison['full_metrics']['auc_roc']*100:.2f}% "
+              f"in {comparison['full_seconds']:.1f}s")
+        print(f"   Incremental:   AUC {metrics['auc_roc']*100:.2f}% in {incremental_seconds:.1f}s "
+              f"(gap {comparison['auc_gap']*100:+.2f} pts)")
+
+    return save_version(rf_model, gb_model, scaler, base['label_encoders'], feature_names, {
+        'training': 'incremental',
+        'parent_version': base_version,
+        'training_rows': int(len(train_rows)),
+        'new_labels': int(len(y_new)),
+        'metrics': metrics,
+        'comparison': comparison,
+        'rf_params': {**rf_params, 'n_estimators': len(rf_model.estimators_)},
+        'gb_params': gb_model.get_params(),
+        'compact': compact_report,
+        'feature_defaults': feature_defaults
+    }, extra_files={'compact_model.json': compact_spec})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Train the churn prediction ensemble')
+    parser.add_argument('--data', default=DATA_PATH, help='Labeled CSV for a full retrain')
+    parser.add_argument('--incremental', metavar='LABELS_CSV',
+                        help='Update the LATEST version with newly labeled customers')
+    parser.add_argument('--compare-full', action='store_true',
+                        help='With --incremental, also run a full retrain and report the gap')
+    parser.add_argument('--tune', action='store_true',
+                        help='Search RF/GB hyperparameters before a full retrain (writes tuning.json)')
+    args = parser.parse_args()
+
+    print("🚀 Starting Customer Churn Model Training...")
+    os.makedirs(REGISTRY_DIR, exist_ok=True)
+
+    if args.incremental:
+        version = train_incremental(args.incremental, compare_full=args.compare_full)
+    else:
+        version = train_full(args.data, tune=args.tune)
+
+    print("\n" + "="*60)
+    print("🎉 MODEL TRAINING COMPLETED SUCCESSFULLY!")
+    print("="*60)
+    print(f"\n📁 Saved model version {version} in '{REGISTRY_DIR}/'")
+    print("\n✅ Ready to make predictions!")
+    print("="*60)
+
+
+if __name__ == '__main__':
+    main()